@@ -0,0 +1,233 @@
+"""
+Build degli asset front-end: font e d3 self-hosted, CSS/JS minificati e nomi con hash del contenuto
+"""
+from typing import Dict, List, Optional, Tuple
+import glob
+import hashlib
+import os
+import re
+import httpx
+from config import ASSETS_CONFIG, BROWSER_CONFIG
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+FONT_FACE_PATTERN = re.compile(r'/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{[^}]*\})')
+FONT_URL_PATTERN = re.compile(r'url\((https://[^)]+)\)')
+FONT_WEIGHT_PATTERN = re.compile(r'font-weight:\s*(\d+)')
+
+GOOGLE_FONTS_LINKS = re.compile(
+    r'[ \t]*<link rel="preconnect" href="https://fonts\.googleapis\.com">\s*'
+    r'<link rel="preconnect" href="https://fonts\.gstatic\.com" crossorigin>\s*'
+    r'<link href="https://fonts\.googleapis\.com/css2\?[^"]*" rel="stylesheet">\n'
+)
+D3_SCRIPT_TAG = re.compile(r'<script defer src="https://cdnjs\.cloudflare\.com/ajax/libs/d3/[^"]*"></script>')
+TREND_DATA_SCRIPT_TAG = re.compile(r'<script defer src="trend_data\.js"></script>')
+STYLE_BLOCK = re.compile(r'<style>(.*?)</style>', re.S)
+SCRIPT_BLOCK = re.compile(r'<script>(.*?)</script>', re.S)
+
+def minify_css(css: str) -> str:
+    """Minifica il CSS (rcssmin se installato, altrimenti regole sicure)"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+def minify_js(js: str) -> str:
+    """
+    Minifica il JavaScript (rjsmin se installato). Senza rjsmin toglie solo
+    indentazione, righe vuote e commenti su riga intera, mantenendo gli a capo
+    per non dipendere dall'inserimento automatico dei punti e virgola.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(js)
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:10]
+
+class AssetBuilder:
+    """
+    Produce in ASSETS_DIR i file statici della pagina con nomi del tipo
+    nome.<hash>.ext: cambiano solo quando cambia il contenuto, quindi
+    possono essere serviti con cache immutabile.
+
+    I file esterni (font Inter, moduli d3) vengono scaricati una volta in
+    VENDOR_DIR. Se non sono raggiungibili il build restituisce None per
+    quella parte e le pagine mantengono i link remoti originali.
+    """
+
+    def __init__(self, output_dir: str, config: Optional[Dict] = None):
+        self.config = {**ASSETS_CONFIG, **(config or {})}
+        self.output_dir = output_dir or '.'
+        self.assets_dir = os.path.join(self.output_dir, self.config['ASSETS_DIR'])
+        self.vendor_dir = self.config['VENDOR_DIR']
+        self._fonts: Optional[Tuple[str, List[str]]] = None
+        self._fonts_checked = False
+
+    def _vendor(self, filename: str, url: str, headers: Optional[Dict] = None) -> bytes:
+        """Contenuto di un file esterno, scaricato solo se non è già in cache"""
+        path = os.path.join(self.vendor_dir, filename)
+        if not os.path.exists(path):
+            response = httpx.get(url, headers=headers, timeout=20, follow_redirects=True)
+            response.raise_for_status()
+            os.makedirs(self.vendor_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(response.content)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def emit(self, name: str, extension: str, content) -> str:
+        """
+        Scrive l'asset con l'hash del contenuto nel nome, rimuove le versioni
+        precedenti e restituisce il percorso relativo alla pagina
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        filename = f"{name}.{content_hash(content)}{extension}"
+        os.makedirs(self.assets_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(self.assets_dir, f"{glob.escape(name)}.*{extension}*")):
+            if os.path.basename(old).split(extension)[0] != filename[:-len(extension)]:
+                os.remove(old)
+        path = os.path.join(self.assets_dir, filename)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+        return f"{self.config['ASSETS_DIR']}/{filename}"
+
+    def fonts(self) -> Optional[Tuple[str, List[str]]]:
+        """
+        Font Inter self-hosted, limitati ai subset in FONT_SUBSETS.
+
+        Returns:
+            Le regole @font-face con URL locali e i file da precaricare,
+            oppure None se i font non sono disponibili
+        """
+        if self._fonts_checked:
+            return self._fonts
+        self._fonts_checked = True
+        try:
+            # Lo user agent di un browser moderno fa restituire i file woff2
+            font_css = self._vendor('inter.css', self.config['FONT_CSS_URL'],
+                                    headers={'User-Agent': BROWSER_CONFIG['user_agent']}).decode('utf-8')
+            rules, preloads, local_urls = [], [], {}
+            for subset, rule in FONT_FACE_PATTERN.findall(font_css):
+                if subset not in self.config['FONT_SUBSETS']:
+                    continue
+                remote_url = FONT_URL_PATTERN.search(rule).group(1)
+                if remote_url not in local_urls:
+                    content = self._vendor(f"inter-{content_hash(remote_url.encode())}.woff2", remote_url)
+                    weight = FONT_WEIGHT_PATTERN.search(rule).group(1)
+                    local_urls[remote_url] = self.emit(f"inter-{subset}-{weight}", '.woff2', content)
+                    if subset in self.config['FONT_PRELOAD_SUBSETS']:
+                        preloads.append(local_urls[remote_url])
+                rules.append(rule.replace(remote_url, local_urls[remote_url]))
+        except (httpx.HTTPError, OSError, AttributeError) as e:
+            print(f"Font Inter non disponibili in locale, uso Google Fonts: {e}")
+            return None
+        self._fonts = '\n'.join(rules), preloads
+        return self._fonts
+
+    @staticmethod
+    def _relative_to_css(font_face_css: str, assets_dir: str) -> str:
+        """Gli URL dei font nel CSS esterno sono relativi alla cartella degli asset"""
+        return font_face_css.replace(f"url({assets_dir}/", "url(")
+
+    @staticmethod
+    def font_preload_tags(preloads: List[str]) -> str:
+        return ''.join(
+            f'    <link rel="preload" href="{href}" as="font" type="font/woff2" crossorigin>\n'
+            for href in preloads
+        )
+
+    def d3_bundle(self) -> Optional[str]:
+        """Bundle dei soli moduli d3 usati (build UMD concatenate), o None se non disponibili"""
+        parts = []
+        try:
+            for name, version in self.config['D3_MODULES']:
+                url = self.config['D3_URL'].format(name=name, version=version)
+                parts.append(self._vendor(f"{name}-{version}.min.js", url).decode('utf-8'))
+        except (httpx.HTTPError, OSError) as e:
+            print(f"Moduli d3 non disponibili in locale, uso la CDN: {e}")
+            return None
+        return self.emit('d3', '.js', ';\n'.join(parts))
+
+    def build_page_assets(self, css: str, js: str, page_name: str) -> Dict[str, str]:
+        """
+        CSS e JS della pagina come file esterni minificati e con hash.
+
+        Returns:
+            'head' da inserire in <head> (preload e fogli di stile) e 'js' con il
+            percorso dello script della pagina
+        """
+        fonts = self.fonts()
+        if fonts:
+            font_face_css, preloads = fonts
+            css = self._relative_to_css(font_face_css, self.config['ASSETS_DIR']) + '\n' + css
+            head = self.font_preload_tags(preloads)
+        else:
+            head = (
+                '    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+                f'    <link href="{self.config["FONT_CSS_URL"]}" rel="stylesheet">\n'
+            )
+        css_href = self.emit(page_name, '.css', minify_css(css))
+        js_href = self.emit(page_name, '.js', minify_js(js))
+        head += f'    <link rel="preload" href="{js_href}" as="script">\n'
+        head += f'    <link rel="stylesheet" href="{css_href}">\n'
+        return {'head': head, 'js': js_href}
+
+    def build_trend_page(self) -> Optional[str]:
+        """
+        Versione ottimizzata di trend.html: d3 e font self-hosted, CSS/JS
+        inline minificati e trend_data.js con hash. Il file sorgente resta
+        invariato, il risultato va in TREND_OUTPUT accanto alla pagina.
+        """
+        source = self.config['TREND_SOURCE']
+        if not os.path.exists(source):
+            return None
+        with open(source, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        head = ''
+        fonts = self.fonts()
+        if fonts:
+            font_face_css, preloads = fonts
+            html = GOOGLE_FONTS_LINKS.sub('', html, count=1)
+            html = STYLE_BLOCK.sub(lambda m: f"<style>{font_face_css}\n{m.group(1)}</style>", html, count=1)
+            head += self.font_preload_tags(preloads)
+
+        d3_href = self.d3_bundle()
+        if d3_href:
+            html = D3_SCRIPT_TAG.sub(f'<script defer src="{d3_href}"></script>', html, count=1)
+            head += f'    <link rel="preload" href="{d3_href}" as="script">\n'
+
+        data_source = self.config['TREND_DATA_SOURCE']
+        if os.path.exists(data_source):
+            with open(data_source, 'r', encoding='utf-8') as f:
+                data_href = self.emit('trend_data', '.js', minify_js(f.read()))
+            html = TREND_DATA_SCRIPT_TAG.sub(f'<script defer src="{data_href}"></script>', html, count=1)
+
+        html = STYLE_BLOCK.sub(lambda m: f"<style>{minify_css(m.group(1))}</style>", html)
+        html = SCRIPT_BLOCK.sub(lambda m: f"<script>{minify_js(m.group(1))}</script>", html)
+        html = re.sub(r'(</title>\n)', lambda m: m.group(1) + head, html, count=1)
+
+        output = os.path.join(self.output_dir, self.config['TREND_OUTPUT'])
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return output
@@ -22,7 +22,13 @@ CONFIG = {
 # Configurazione browser
 BROWSER_CONFIG = {
     'viewport': {'width': 1920, 'height': 1080},
-    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    # Header per le pagine dei singoli video (Accept-Encoding gestito dal trasporto)
+    'detail_headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.8',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    }
 }
 
 # Configurazione API endpoints
@@ -30,3 +36,105 @@ API_CONFIG = {
     'trend_list_url': "https://ads.tiktok.com/creative_radar_api/v1/popular_trend/list",
     'base_referer': "https://ads.tiktok.com/business/creativecenter/inspiration/popular/pc/en"
 }
+
+# Configurazione trasporto HTTP condiviso (liste e dettagli video)
+TRANSPORT_CONFIG = {
+    'HTTP2': True,                 # Multiplexing HTTP/2 se il pacchetto h2 è installato
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 30,        # Secondi prima di chiudere una connessione inattiva
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 20,
+    'WRITE_TIMEOUT': 5,
+    'POOL_TIMEOUT': 10,
+    'MAX_REQUESTS_PER_SECOND': 2,  # Limite condiviso da tutti i worker (circa il ritmo sequenziale); None = nessun limite
+    'BASE_URL': None,              # Es. 'http://127.0.0.1:8080' per un server locale di test
+}
+
+# Configurazione pipeline asincrona (lista -> top-K -> dettagli -> output)
+PIPELINE_CONFIG = {
+    'LIST_WORKERS': 4,      # Pagine della lista scaricate in parallelo
+    'DETAIL_WORKERS': 8,    # Video analizzati in parallelo
+    'QUEUE_SIZE': 32,       # Capienza di ogni coda tra gli stadi (backpressure)
+    'DETAIL_PROCESSES': 1,  # >1: analisi dettagliata suddivisa su più processi (DETAIL_WORKERS ciascuno,
+                            # MAX_INFLIGHT_BYTES e MAX_REQUESTS_PER_SECOND divisi tra i processi)
+    'SHARD_SHUTDOWN_TIMEOUT': 10,  # Secondi concessi ai processi per finire il video in corso prima di terminarli
+}
+
+# Cache delle pagine della lista (richieste condizionali / hash del body)
+CACHE_CONFIG = {
+    'ENABLED': True,
+    'PATH': '.http_cache.json',
+}
+
+# Profilazione (disattivata di default)
+PROFILING_CONFIG = {
+    'TRACEMALLOC': False,          # Snapshot tracemalloc alla fine di ogni fase
+    'TRACEMALLOC_FRAMES': 10,
+    'TRACEMALLOC_TOP': 20,         # Righe riportate nel confronto tra snapshot
+    'CPROFILE': False,             # Un file .prof per ogni fase
+    'MARKERS': False,              # Marcatori di inizio/fine fase (nome thread visibile in py-spy dump)
+    'OUTPUT_DIR': 'profiles',
+}
+
+# Modalità a memoria limitata per l'analisi dettagliata dei video
+MEMORY_CONFIG = {
+    'BOUNDED_DETAIL': False,
+    'MAX_INFLIGHT_BYTES': 32 * 1024 * 1024,   # Byte massimi di pagine video in memoria contemporaneamente
+    'MAX_PAGE_BYTES': 4 * 1024 * 1024,        # Riservati per ogni download; pagine più grandi vengono scartate
+}
+
+# Server locale di anteprima per i file generati
+SERVER_CONFIG = {
+    'HOST': '127.0.0.1',
+    'PORT': 8000,
+    'ROOT': None,                   # Cartella servita, None = cartella di LOCAL_FILENAME
+    # Solo i file generati: sorgenti .py, fixture e configurazione non vengono mai serviti
+    'SERVED_EXTENSIONS': ('.html', '.js', '.css', '.json', '.woff2', '.svg', '.png', '.jpg', '.webp', '.ico'),
+    'PRECOMPRESS': True,            # Crea le varianti .gz/.br dei file di testo all'avvio
+    'COMPRESSIBLE': ('.html', '.js', '.css', '.json', '.svg', '.txt'),
+}
+
+# Build degli asset front-end (font e d3 self-hosted, minificati, con hash nel nome)
+ASSETS_CONFIG = {
+    'ENABLED': True,
+    'ASSETS_DIR': 'assets',        # Relativa alla cartella di LOCAL_FILENAME
+    'VENDOR_DIR': 'vendor',        # Cache locale dei file scaricati una sola volta
+    'FONT_CSS_URL': 'https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap',
+    'FONT_SUBSETS': ('latin', 'latin-ext'),
+    'FONT_PRELOAD_SUBSETS': ('latin',),
+    'D3_URL': 'https://cdn.jsdelivr.net/npm/{name}@{version}/dist/{name}.min.js',
+    # Solo i moduli usati da trend.html (d3 7.8.5), in ordine di dipendenza
+    'D3_MODULES': (
+        ('d3-array', '3.2.4'),
+        ('d3-color', '3.1.0'),
+        ('d3-dispatch', '3.0.1'),
+        ('d3-ease', '3.0.1'),
+        ('d3-format', '3.1.0'),
+        ('d3-interpolate', '3.0.1'),
+        ('d3-path', '3.1.0'),
+        ('d3-selection', '3.0.0'),
+        ('d3-timer', '3.0.1'),
+        ('d3-time', '3.1.0'),
+        ('d3-time-format', '4.1.0'),
+        ('d3-scale', '4.0.2'),
+        ('d3-shape', '3.2.0'),
+        ('d3-axis', '3.0.0'),
+        ('d3-transition', '3.0.1'),
+    ),
+    'TREND_SOURCE': 'trend.html',
+    'TREND_DATA_SOURCE': 'trend_data.js',
+    'TREND_OUTPUT': 'trend.min.html',
+}
+
+# Registrazione e riproduzione offline delle risposte (None, 'record' o 'replay')
+REPLAY_CONFIG = {
+    'MODE': None,
+    'ARCHIVE': 'fixtures/replay.zip',
+    'LATENCY': 0.0,                # Secondi di latenza simulata per risposta
+    'LATENCY_JITTER': 0.0,         # Variazione massima (+/-) della latenza
+    'ERROR_RATE': 0.0,             # Frazione di risposte sostituite da ERROR_STATUS
+    'ERROR_STATUS': 503,
+    'CONNECTION_ERROR_RATE': 0.0,  # Frazione di richieste che falliscono con errore di connessione
+    'SEED': 1234,                  # Stesso seed = stessi ritardi ed errori per ogni richiesta
+}
@@ -1,20 +1,18 @@
 import json
-from typing import List, Dict
-from config import CONFIG
+import os
+from typing import List, Dict, Optional
+from config import CONFIG, ASSETS_CONFIG
+from assets import AssetBuilder
+from search_index import build_index, write_index, index_filename
 
 class HTMLGenerator:
-    @staticmethod
-    def get_html_template(videos_data: List[Dict]) -> str:
-        html_start = '''<!DOCTYPE html>
-<html lang="it">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ScripTok</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
+    # Font remoti, usati quando gli asset self-hosted non sono disponibili
+    FONT_LINKS = '''    <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
-    <style>
+'''
+
+    PAGE_CSS = '''
         * { 
             box-sizing: border-box;
             margin: 0;
@@ -218,6 +216,32 @@ class HTMLGenerator:
             color: var(--text-secondary);
         }
 
+        .filters {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 12px;
+            justify-content: center;
+            margin: 20px 0;
+        }
+
+        .filters input,
+        .filters select {
+            padding: 12px 16px;
+            background: var(--card-bg);
+            color: var(--text);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            border-radius: 12px;
+            font-family: inherit;
+            font-size: 14px;
+            min-width: 220px;
+        }
+
+        .filters input:focus,
+        .filters select:focus {
+            outline: none;
+            border-color: var(--primary);
+        }
+
         @media (max-width: 768px) {
             .grid { 
                 grid-template-columns: 1fr;
@@ -239,76 +263,129 @@ class HTMLGenerator:
                 grid-template-columns: repeat(2, 1fr);
             }
         }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>ScripTok</h1>
-            <p>I video più popolari in Italia</p>
-        </div>
-        <div class="pagination"></div>
-        <div class="pagination-info"></div>
-        <div class="grid" id="videos-container">
-        </div>
-        <div class="pagination"></div>
-    </div>
-    <script>'''
+'''
 
-        videos_json = json.dumps([{
-            'id': video['url'].split('/')[-1],
-            'title': video['titolo'],
-            'creator': video['creator'],
-            'views': video['views'],
-            'url': video['url'],
-            'categories': [cat for cat in video['categorie'].split(', ') if cat != 'N/A'],
-            'keywords': [kw for kw in video['keywords'].split(', ') if kw != 'N/A']
-        } for video in videos_data])
+    PAGE_JS = '''
+        let currentPage = 1;
+        let filteredVideos = videos;
+        let totalPages = Math.max(1, Math.ceil(videos.length / VIDEOS_PER_PAGE));
 
-        html_middle = f'''
-        const VIDEOS_PER_PAGE = {CONFIG['VIDEOS_PER_PAGE']};
-        const videos = {videos_json};
+        // Ricerca sull'indice invertito generato in fase di build
+        // vocabulary è ordinato come il confronto tra stringhe JavaScript, postings è parallelo
+        const vocabulary = SEARCH_INDEX.vocabulary;
 
-        let currentPage = 1;
-        const totalPages = Math.ceil(videos.length / VIDEOS_PER_PAGE);
+        function normalize(text) {
+            return text.toLowerCase().normalize('NFD').replace(/\\p{M}/gu, '');
+        }
 
-        const videoObserver = new IntersectionObserver((entries, observer) => {{
-            entries.forEach(entry => {{
-                if (entry.isIntersecting) {{
+        function tokenize(text) {
+            return (normalize(text).match(/[\\p{L}\\p{N}]+/gu) || []).filter(t => t.length >= 2);
+        }
+
+        function decodePostings(encoded) {
+            const decoded = new Array(encoded.length);
+            let current = 0;
+            for (let i = 0; i < encoded.length; i++) {
+                current += encoded[i];
+                decoded[i] = current;
+            }
+            return decoded;
+        }
+
+        function intersect(a, b) {
+            const result = [];
+            let i = 0, j = 0;
+            while (i < a.length && j < b.length) {
+                if (a[i] === b[j]) { result.push(a[i]); i++; j++; }
+                else if (a[i] < b[j]) i++;
+                else j++;
+            }
+            return result;
+        }
+
+        function prefixPostings(prefix) {
+            let low = 0, high = vocabulary.length;
+            while (low < high) {
+                const mid = (low + high) >> 1;
+                if (vocabulary[mid] < prefix) low = mid + 1; else high = mid;
+            }
+            const docs = new Set();
+            for (let i = low; i < vocabulary.length && vocabulary[i].startsWith(prefix); i++) {
+                decodePostings(SEARCH_INDEX.postings[i]).forEach(d => docs.add(d));
+            }
+            return Array.from(docs).sort((a, b) => a - b);
+        }
+
+        function searchVideos(query, creator, category) {
+            let result = null;
+            const narrow = docs => { result = result === null ? docs : intersect(result, docs); };
+            tokenize(query).forEach(token => narrow(prefixPostings(token)));
+            if (creator) narrow(decodePostings(SEARCH_INDEX.facets.creator[creator] || []));
+            if (category) narrow(decodePostings(SEARCH_INDEX.facets.categories[category] || []));
+            return result === null ? videos : result.map(docId => videos[docId]);
+        }
+
+        function fillFilter(id, facet) {
+            const select = document.getElementById(id);
+            // sort(): le chiavi numeriche di un oggetto non mantengono l'ordine dell'indice
+            Object.keys(SEARCH_INDEX.facets[facet]).sort().forEach(value => {
+                const option = document.createElement('option');
+                option.value = value;
+                option.textContent = `${value} (${SEARCH_INDEX.facets[facet][value].length})`;
+                select.appendChild(option);
+            });
+            select.addEventListener('change', applyFilters);
+        }
+
+        function applyFilters() {
+            filteredVideos = searchVideos(
+                document.getElementById('search-input').value,
+                document.getElementById('creator-filter').value,
+                document.getElementById('category-filter').value
+            );
+            totalPages = Math.max(1, Math.ceil(filteredVideos.length / VIDEOS_PER_PAGE));
+            currentPage = 1;
+            displayCurrentPage();
+            updatePagination();
+        }
+
+        const videoObserver = new IntersectionObserver((entries, observer) => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
                     const container = entry.target;
                     const iframe = container.querySelector('iframe');
-                    if (iframe.dataset.src) {{
+                    if (iframe.dataset.src) {
                         iframe.src = iframe.dataset.src;
                         iframe.removeAttribute('data-src');
                         observer.unobserve(container);
-                    }}
-                }}
-            }});
-        }}, {{
+                    }
+                }
+            });
+        }, {
             rootMargin: '50px 0px',
             threshold: 0.1
-        }});
+        });
 
-        function createVideoCard(video) {{
+        function createVideoCard(video) {
             const categories = video.categories.map(cat => 
-                `<span class="tag">${{cat}}</span>`).join(' ') || 'Nessuna categoria';
+                `<span class="tag">${cat}</span>`).join(' ') || 'Nessuna categoria';
             const keywords = video.keywords.map(kw => 
-                `<span class="tag">${{kw}}</span>`).join(' ') || 'Nessuna parola chiave';
+                `<span class="tag">${kw}</span>`).join(' ') || 'Nessuna parola chiave';
             
             const card = document.createElement('div');
             card.className = 'video-card';
             card.innerHTML = `
-                <div class="video-title">${{video.title}}</div>
+                <div class="video-title">${video.title}</div>
                 <div class="video-stats">
-                    <span><strong>Creator:</strong> ${{video.creator}}</span>
-                    <span><strong>Views:</strong> ${{video.views}}</span>
+                    <span><strong>Creator:</strong> ${video.creator}</span>
+                    <span><strong>Views:</strong> ${video.views}</span>
                 </div>
                 <div class="video-url">
-                    <a href="${{video.url}}" target="_blank">${{video.url}}</a>
+                    <a href="${video.url}" target="_blank">${video.url}</a>
                 </div>
                 <div class="video-container">
                     <div class="video-embed">
-                        <iframe data-src="https://www.tiktok.com/embed/${{video.id}}"
+                        <iframe data-src="https://www.tiktok.com/embed/${video.id}"
                                 allowfullscreen scrolling="no"
                                 allow="encrypted-media;">
                         </iframe>
@@ -316,67 +393,145 @@ class HTMLGenerator:
                 </div>
                 <div class="metadata">
                     <strong>Categorie:</strong>
-                    ${{categories}}
+                    ${categories}
                 </div>
                 <div class="metadata" style="margin-top: 16px;">
                     <strong>Keywords:</strong>
-                    ${{keywords}}
+                    ${keywords}
                 </div>
             `;
             return card;
-        }}
+        }
 
-        function updatePagination() {{
+        function updatePagination() {
             const paginationElements = document.querySelectorAll('.pagination');
             const paginationHTML = `
-                <button onclick="changePage(1)" ${{currentPage === 1 ? 'disabled' : ''}}>Prima</button>
-                <button onclick="changePage(${{currentPage - 1}})" ${{currentPage === 1 ? 'disabled' : ''}}>⬅️</button>
-                <button onclick="changePage(${{currentPage + 1}})" ${{currentPage === totalPages ? 'disabled' : ''}}>➡️</button>
-                <button onclick="changePage(${{totalPages}})" ${{currentPage === totalPages ? 'disabled' : ''}}>Ultima</button>
+                <button onclick="changePage(1)" ${currentPage === 1 ? 'disabled' : ''}>Prima</button>
+                <button onclick="changePage(${currentPage - 1})" ${currentPage === 1 ? 'disabled' : ''}>⬅️</button>
+                <button onclick="changePage(${currentPage + 1})" ${currentPage === totalPages ? 'disabled' : ''}>➡️</button>
+                <button onclick="changePage(${totalPages})" ${currentPage === totalPages ? 'disabled' : ''}>Ultima</button>
             `;
             paginationElements.forEach(el => el.innerHTML = paginationHTML);
             
             document.querySelector('.pagination-info').textContent = 
-                `Pagina ${{currentPage}} di ${{totalPages}} (${{videos.length}} video totali)`;
-        }}
+                filteredVideos.length === videos.length
+                    ? `Pagina ${currentPage} di ${totalPages} (${videos.length} video totali)`
+                    : `Pagina ${currentPage} di ${totalPages} (${filteredVideos.length} di ${videos.length} video)`;
+        }
 
-        function changePage(newPage) {{
+        function changePage(newPage) {
             if (newPage < 1 || newPage > totalPages) return;
             currentPage = newPage;
             displayCurrentPage();
             updatePagination();
-            window.scrollTo({{
+            window.scrollTo({
                 top: 0,
                 behavior: 'smooth'
-            }});
-        }}
+            });
+        }
 
-        function displayCurrentPage() {{
+        function displayCurrentPage() {
             const container = document.getElementById('videos-container');
             container.innerHTML = '';
             
             const start = (currentPage - 1) * VIDEOS_PER_PAGE;
             const end = start + VIDEOS_PER_PAGE;
-            const pageVideos = videos.slice(start, end);
+            const pageVideos = filteredVideos.slice(start, end);
             
-            pageVideos.forEach(video => {{
+            pageVideos.forEach(video => {
                 const card = createVideoCard(video);
                 container.appendChild(card);
                 videoObserver.observe(card.querySelector('.video-container'));
-            }});
-        }}
+            });
+        }
+
+        fillFilter('creator-filter', 'creator');
+        fillFilter('category-filter', 'categories');
+        document.getElementById('search-input').addEventListener('input', applyFilters);
 
         displayCurrentPage();
         updatePagination();
+'''
+
+    @staticmethod
+    def get_html_template(videos_data: List[Dict], search_index: Optional[Dict] = None,
+                          assets: Optional[Dict] = None) -> str:
+        """
+        Genera l'HTML della pagina. Con assets (vedi AssetBuilder.build_page_assets)
+        CSS e JS sono file esterni con hash, altrimenti vengono inclusi inline.
+        """
+        if assets:
+            head_assets = assets['head']
+            page_script = f'    <script src="{assets["js"]}"></script>\n'
+        else:
+            head_assets = HTMLGenerator.FONT_LINKS + f"    <style>{HTMLGenerator.PAGE_CSS}    </style>\n"
+            page_script = f"    <script>{HTMLGenerator.PAGE_JS}    </script>\n"
+
+        html_start = '''<!DOCTYPE html>
+<html lang="it">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>ScripTok</title>
+''' + head_assets + '''</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>ScripTok</h1>
+            <p>I video più popolari in Italia</p>
+        </div>
+        <div class="filters">
+            <input type="search" id="search-input" placeholder="Cerca titolo, keyword, creator...">
+            <select id="creator-filter"><option value="">Tutti i creator</option></select>
+            <select id="category-filter"><option value="">Tutte le categorie</option></select>
+        </div>
+        <div class="pagination"></div>
+        <div class="pagination-info"></div>
+        <div class="grid" id="videos-container">
+        </div>
+        <div class="pagination"></div>
+    </div>
+'''
+
+        videos = HTMLGenerator.prepare_videos(videos_data)
+        videos_json = json.dumps(videos)
+        if search_index is None:
+            search_index = build_index(videos)
+        index_json = json.dumps(search_index, separators=(',', ':'))
+
+        html_data = f'''    <script>
+        const VIDEOS_PER_PAGE = {CONFIG['VIDEOS_PER_PAGE']};
+        const videos = {videos_json};
+        const SEARCH_INDEX = {index_json};
     </script>
-</body>
+'''
+
+        return html_start + html_data + page_script + '''</body>
 </html>'''
 
-        return html_start + html_middle
+    @staticmethod
+    def prepare_videos(videos_data: List[Dict]) -> List[Dict]:
+        """Converte i dati dello scraper nel formato usato dalla pagina e dall'indice"""
+        return [{
+            'id': video['url'].split('/')[-1],
+            'title': video['titolo'],
+            'creator': video['creator'],
+            'views': video['views'],
+            'url': video['url'],
+            'categories': [cat for cat in video['categorie'].split(', ') if cat != 'N/A'],
+            'keywords': [kw for kw in video['keywords'].split(', ') if kw != 'N/A']
+        } for video in videos_data]
 
     @staticmethod
     def generate_html_file(videos_data: List[Dict], output_filename: str):
-        """Genera il file HTML con i video"""
-        html_content = HTMLGenerator.get_html_template(videos_data)
+        """Genera il file HTML con i video, l'indice di ricerca e gli asset front-end"""
+        search_index = build_index(HTMLGenerator.prepare_videos(videos_data))
+        assets = None
+        if ASSETS_CONFIG['ENABLED']:
+            builder = AssetBuilder(os.path.dirname(output_filename))
+            assets = builder.build_page_assets(HTMLGenerator.PAGE_CSS, HTMLGenerator.PAGE_JS, 'scriptok')
+            builder.build_trend_page()
+        html_content = HTMLGenerator.get_html_template(videos_data, search_index, assets)
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
+        write_index(search_index, index_filename(output_filename))
@@ -0,0 +1,139 @@
+"""
+Cache delle risposte HTTP delle pagine della lista dei trend
+"""
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+from config import CACHE_CONFIG
+
+class ResponseCache:
+    """
+    Conserva per ogni richiesta (paese, periodo, pagina, ...) i validatori
+    HTTP (ETag, Last-Modified), l'hash del body e i video già estratti.
+
+    Se il server li supporta si inviano richieste condizionali e un 304
+    restituisce direttamente i video salvati. Altrimenti, se il body ricevuto
+    ha lo stesso hash dell'ultima volta, si evita di ri-analizzare il JSON.
+
+    Accanto a ogni pagina vengono salvati anche i dati dettagliati dei suoi
+    video (per item_id): se la pagina non è cambiata, l'analisi dettagliata
+    di quei video viene saltata. Una pagina cambiata riparte senza dettagli.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**CACHE_CONFIG, **(config or {})}
+        self.enabled = self.config['ENABLED']
+        self.path = self.config['PATH']
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.detail_hits = 0
+        self._dirty = False
+        # Pagina della lista (chiave) di ogni video visto in questa esecuzione
+        self._item_keys: Dict[str, str] = {}
+        self._unchanged_keys = set()
+        if self.enabled:
+            self.load()
+
+    @staticmethod
+    def make_key(url: str, params: Dict) -> str:
+        """Chiave della richiesta: URL e parametri ordinati (senza header di autenticazione)"""
+        query = '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{url}?{query}"
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def load(self):
+        """Carica la cache dal disco, se presente"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Cache HTTP non leggibile, verrà ricreata: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Salva la cache su disco se è stata modificata"""
+        if not self.enabled or not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        """Header If-None-Match / If-Modified-Since per la richiesta"""
+        entry = self.entries.get(key) if self.enabled else None
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def not_modified(self, key: str) -> Optional[List[Dict]]:
+        """Video salvati per una risposta 304"""
+        entry = self.entries.get(key) if self.enabled else None
+        if entry is None:
+            return None
+        self.hits += 1
+        self._track(key, entry['videos'], unchanged=True)
+        return entry['videos']
+
+    def lookup_body(self, key: str, body: bytes) -> Optional[List[Dict]]:
+        """Video salvati se il body è identico a quello già visto, altrimenti None"""
+        entry = self.entries.get(key) if self.enabled else None
+        if entry is not None and entry.get('body_hash') == self.body_hash(body):
+            self.hits += 1
+            self._track(key, entry['videos'], unchanged=True)
+            return entry['videos']
+        self.misses += 1
+        return None
+
+    def store(self, key: str, body: bytes, headers, videos: List[Dict]):
+        """Registra validatori, hash del body e video estratti"""
+        if not self.enabled:
+            return
+        self.entries[key] = {
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'body_hash': self.body_hash(body),
+            'videos': videos
+        }
+        self._track(key, videos, unchanged=False)
+        self._dirty = True
+
+    def _track(self, key: str, videos: List[Dict], unchanged: bool):
+        """Associa i video alla loro pagina (una pagina invariata ha la precedenza)"""
+        if unchanged:
+            self._unchanged_keys.add(key)
+        for video in videos:
+            item_id = str(video['item_id'])
+            if unchanged or item_id not in self._item_keys:
+                self._item_keys[item_id] = key
+
+    def cached_details(self, item_id: str) -> Optional[Dict]:
+        """Dati dettagliati del video se la sua pagina della lista non è cambiata"""
+        key = self._item_keys.get(str(item_id))
+        if not self.enabled or key not in self._unchanged_keys:
+            return None
+        details = self.entries[key].get('details', {}).get(str(item_id))
+        if details is not None:
+            self.detail_hits += 1
+        return details
+
+    def store_details(self, item_id: str, video_data: Dict):
+        """Salva i dati dettagliati del video accanto alla sua pagina della lista"""
+        key = self._item_keys.get(str(item_id))
+        if not self.enabled or key not in self.entries:
+            return
+        self.entries[key].setdefault('details', {})[str(item_id)] = video_data
+        self._dirty = True
@@ -2,11 +2,12 @@
 Script principale che coordina l'esecuzione del programma
 """
 import asyncio
-import time
 import os
-from config import CONFIG, BROWSER_CONFIG, API_CONFIG
+from config import CONFIG, BROWSER_CONFIG, API_CONFIG, PIPELINE_CONFIG
 from scraper import TikTokScraper
 from html_template import HTMLGenerator
+from pipeline import ScrapingPipeline, PartialResults, partial_filename
+from profiling import Profiler
 
 async def main(pages: int = None, num_videos: int = None):
     """
@@ -16,9 +17,19 @@ async def main(pages: int = None, num_videos: int = None):
         pages: Numero di pagine da analizzare (opzionale)
         num_videos: Numero di video da includere nell'output (opzionale)
     """
-    # Inizializza lo scraper
-    scraper = TikTokScraper()
-    
+    # Inizializza lo scraper (il trasporto HTTP viene chiuso all'uscita)
+    async with TikTokScraper() as scraper:
+        await run_scraping(scraper, pages, num_videos)
+
+async def run_scraping(scraper: TikTokScraper, pages: int = None, num_videos: int = None):
+    """Esegue scraping e generazione dell'output con lo scraper indicato"""
+    profiler = Profiler()
+    try:
+        await scrape_and_render(scraper, profiler, pages, num_videos)
+    finally:
+        profiler.close()
+
+async def scrape_and_render(scraper: TikTokScraper, profiler: Profiler, pages: int = None, num_videos: int = None):
     # Usa i valori passati o quelli di default da CONFIG
     pages_to_analyze = min(27, pages if pages is not None else CONFIG['PAGES_TO_ANALYZE'])
     output_videos = num_videos if num_videos is not None else CONFIG['OUTPUT_VIDEOS']
@@ -30,10 +41,13 @@ async def main(pages: int = None, num_videos: int = None):
     print(f"- Paese: {CONFIG['COUNTRY_CODE']}")
     print(f"- Periodo: ultimi {CONFIG['TIME_PERIOD']} giorni")
     print(f"- File di output locale: {CONFIG['LOCAL_FILENAME']}")
-    print(f"- Nome file sul server: {CONFIG['REMOTE_FILENAME']}\n")
+    print(f"- Nome file sul server: {CONFIG['REMOTE_FILENAME']}")
+    print(f"- Processi per l'analisi dettagliata: {PIPELINE_CONFIG['DETAIL_PROCESSES']}")
+    print(f"- Modalità a memoria limitata: {'sì' if scraper.memory_config['BOUNDED_DETAIL'] else 'no'}\n")
 
     # Ottiene i parametri di autenticazione
-    auth_params = await scraper.extract_auth_params()
+    with profiler.stage('auth'):
+        auth_params = await scraper.extract_auth_params()
     if not auth_params:
         print("Errore nell'estrazione dei parametri di autenticazione")
         return
@@ -57,51 +71,37 @@ async def main(pages: int = None, num_videos: int = None):
         "Referer": API_CONFIG['base_referer']
     }
 
-    # Recupera tutti i video
-    all_videos = []
-    for page in range(1, pages_to_analyze + 1):
-        videos = scraper.fetch_tiktok_page(page, params, headers)
-        if videos:
-            all_videos.extend(videos)
-            print(f"Pagina {page}/{pages_to_analyze} completata")
-        time.sleep(CONFIG['DELAY'])
+    # Assicurati che la directory esista
+    output_dir = os.path.dirname(CONFIG['LOCAL_FILENAME'])
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
 
-    total_videos = len(all_videos)
-    print(f"\nTotale video trovati: {total_videos}")
+    # Lista, selezione dei più recenti e analisi dettagliata procedono in parallelo.
+    # Ogni video analizzato viene salvato subito nel file dei risultati parziali
+    partial_results = PartialResults(partial_filename(CONFIG['LOCAL_FILENAME']))
+    pipeline = ScrapingPipeline(scraper, params, headers, pages_to_analyze, output_videos,
+                                on_result=partial_results)
+    try:
+        with profiler.stage('pipeline'):
+            videos_data, total_videos = await pipeline.run()
+    finally:
+        partial_results.close()
+    profiler.report_stages(pipeline.stage_stats)
+    output_videos = pipeline.selected_videos
+    if scraper.response_cache.hits:
+        print(f"\nPagine della lista servite dalla cache: {scraper.response_cache.hits}")
+    if scraper.response_cache.detail_hits:
+        print(f"Video non rianalizzati (pagina invariata): {scraper.response_cache.detail_hits}")
+    if not total_videos:
+        partial_results.discard()
     
-    if all_videos:
-        print("\nOrdinamento di tutti i video per timestamp...")
-        all_videos_sorted = sorted(all_videos, key=lambda x: int(x['item_id']), reverse=True)
-        
-        # Verifica che il numero richiesto non sia maggiore del totale disponibile
-        output_videos = min(output_videos, total_videos)
-        top_videos = all_videos_sorted[:output_videos]
-        
-        print(f"\nInizio analisi dettagliata dei {output_videos} video più recenti tra i {total_videos} video trovati...\n")
-        
-        videos_data = []
-        for idx, video in enumerate(top_videos, 1):
-            url = video['item_url']
-            print(f"\nAnalisi video {idx}/{output_videos}: {url}")
-            
-            video_data = scraper.extract_video_data(url)
-            if video_data:
-                videos_data.append(video_data)
-                print(f"Video {idx} analizzato con successo")
-            else:
-                print(f"Non è stato possibile analizzare questo video")
-            
-            time.sleep(CONFIG['DELAY'])
-
-        # Assicurati che la directory esista
-        output_dir = os.path.dirname(CONFIG['LOCAL_FILENAME'])
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
+    if total_videos:
         # Genera il file HTML con il nome specificato in LOCAL_FILENAME
-        HTMLGenerator.generate_html_file(videos_data, CONFIG['LOCAL_FILENAME'])
+        with profiler.stage('render'):
+            HTMLGenerator.generate_html_file(videos_data, CONFIG['LOCAL_FILENAME'])
         
         if os.path.exists(CONFIG['LOCAL_FILENAME']):
+            partial_results.discard()
             print(f"\nFile HTML generato con successo: {CONFIG['LOCAL_FILENAME']}")
             print(f"Dimensione file: {os.path.getsize(CONFIG['LOCAL_FILENAME'])} bytes")
         else:
@@ -0,0 +1,42 @@
+"""
+Limite in byte per le pagine video scaricate contemporaneamente
+"""
+import asyncio
+
+class ByteBudget:
+    """
+    Semaforo a byte: acquire(n) attende finché i byte riservati più n non
+    superano il limite. Una singola richiesta più grande del limite passa
+    comunque quando non c'è nient'altro in corso, per non bloccarsi.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int):
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.used == 0 or self.used + size <= self.limit
+            )
+            self.used += size
+
+    async def resize(self, old_size: int, new_size: int):
+        """
+        Aggiorna una prenotazione: se si riduce libera subito la differenza,
+        se cresce attende lo spazio come acquire
+        """
+        extra = new_size - old_size
+        async with self._condition:
+            if extra > 0:
+                await self._condition.wait_for(
+                    lambda: self.used == old_size or self.used + extra <= self.limit
+                )
+            self.used += extra
+            self._condition.notify_all()
+
+    async def release(self, size: int):
+        async with self._condition:
+            self.used -= size
+            self._condition.notify_all()
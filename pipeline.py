@@ -0,0 +1,307 @@
+"""
+Pipeline asincrona che collega elenco dei video, analisi dettagliata e output
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import json
+import os
+import time
+from config import CONFIG, PIPELINE_CONFIG
+from sharding import ShardedExtractor
+
+# Segnale di fine flusso propagato da uno stadio al successivo
+_DONE = object()
+
+async def run_stages(*coros):
+    """
+    Esegue gli stadi in parallelo. Se uno stadio fallisce o la pipeline viene
+    cancellata, tutti gli altri stadi vengono cancellati.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def partial_filename(html_filename: str) -> str:
+    """File dei risultati parziali accanto all'HTML generato"""
+    return f"{os.path.splitext(html_filename)[0]}.partial.jsonl"
+
+class PartialResults:
+    """
+    Sink incrementale per on_result: ogni video analizzato viene aggiunto
+    subito a un file JSON Lines, così un'esecuzione interrotta conserva i
+    risultati già ottenuti. Il file va rimosso (discard) quando la pagina
+    finale è stata generata.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def __call__(self, rank: int, video_data: Dict):
+        self._file.write(json.dumps({'rank': rank, **video_data}, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class ScrapingPipeline:
+    """
+    Stadi collegati da code limitate:
+
+    pagine -> list worker -> top-K/dedupe -> detail worker -> sink
+
+    Con DETAIL_PROCESSES > 1 i detail worker sono sostituiti da processi
+    separati (ShardedExtractor), ognuno con il proprio fetcher asincrono.
+
+    Le code limitate fanno da backpressure: uno stadio più veloce si ferma
+    quando quello successivo non tiene il passo, quindi la memoria resta
+    limitata dalle dimensioni delle code (più l'heap dei K video migliori).
+
+    Il numero di worker non cambia il ritmo delle richieste verso TikTok:
+    tutte passano dal limite condiviso del trasporto (MAX_REQUESTS_PER_SECOND).
+
+    I video di pagine della lista invariate (304 o stesso hash del body) con
+    dati dettagliati già in cache passano direttamente al sink, senza detail
+    worker né richieste.
+    """
+
+    def __init__(self, scraper, params: Dict, headers: Dict, pages: int, output_videos: int,
+                 config: Optional[Dict] = None,
+                 on_result: Optional[Callable[[int, Dict], None]] = None):
+        """
+        Args:
+            scraper: Istanza di TikTokScraper
+            params: Parametri delle richieste alla lista dei trend
+            headers: Header di autenticazione
+            pages: Numero di pagine da analizzare
+            output_videos: Numero di video da analizzare in dettaglio
+            config: Configurazione della pipeline (default PIPELINE_CONFIG)
+            on_result: Callback chiamata con (posizione, dati) appena un video è
+                analizzato, prima della fine della pipeline (es. PartialResults)
+        """
+        self.scraper = scraper
+        self.params = params
+        self.headers = headers
+        self.pages = pages
+        self.output_videos = output_videos
+        self.config = {**PIPELINE_CONFIG, **(config or {})}
+        self.on_result = on_result
+
+        self.total_videos = 0
+        self.selected_videos = 0
+        # Per stadio: elementi elaborati, tempo occupato e intervallo di attività
+        self.stage_stats: Dict[str, Dict[str, float]] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def _timed(self, stage: str):
+        """Conta un elemento elaborato dallo stadio e il tempo impiegato"""
+        start = time.perf_counter() - self._started
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self._started
+            stats = self.stage_stats.setdefault(stage, {'items': 0, 'busy': 0.0, 'first': start, 'last': end})
+            stats['items'] += 1
+            stats['busy'] += end - start
+            stats['first'] = min(stats['first'], start)
+            stats['last'] = max(stats['last'], end)
+
+    async def run(self) -> Tuple[List[Dict], int]:
+        """
+        Esegue la pipeline completa.
+
+        Returns:
+            I dati dei video analizzati (dal più recente) e il numero di video unici trovati
+        """
+        self._started = time.perf_counter()
+        list_workers = self.config['LIST_WORKERS']
+        detail_workers = self.config['DETAIL_WORKERS']
+        queue_size = self.config['QUEUE_SIZE']
+
+        page_queue = asyncio.Queue()
+        for page in range(1, self.pages + 1):
+            page_queue.put_nowait(page)
+
+        list_queue = asyncio.Queue(maxsize=queue_size)
+        detail_queue = asyncio.Queue(maxsize=queue_size)
+        result_queue = asyncio.Queue(maxsize=queue_size)
+        results: Dict[int, Dict] = {}
+
+        processes = self.config['DETAIL_PROCESSES']
+        replay = getattr(self.scraper, 'replay', None)
+        if processes > 1 and replay and replay.recording:
+            # Ogni processo avrebbe un proprio archivio: la registrazione resta in un solo processo
+            print("Registrazione attiva: analisi dettagliata in un solo processo")
+            processes = 1
+
+        if processes > 1:
+            await run_stages(
+                *[self._list_worker(page_queue, list_queue) for _ in range(list_workers)],
+                self._sharded_details(list_queue, result_queue, list_workers, processes),
+                self._sink(result_queue, results, 1)
+            )
+        else:
+            await run_stages(
+                *[self._list_worker(page_queue, list_queue) for _ in range(list_workers)],
+                self._top_k(list_queue, detail_queue, result_queue, list_workers, detail_workers),
+                *[self._detail_worker(detail_queue, result_queue) for _ in range(detail_workers)],
+                self._sink(result_queue, results, detail_workers)
+            )
+
+        # Le posizioni seguono l'ordine per item_id decrescente
+        return [results[rank] for rank in sorted(results)], self.total_videos
+
+    async def _list_worker(self, page_queue: asyncio.Queue, list_queue: asyncio.Queue):
+        """Scarica le pagine della lista dei trend"""
+        while True:
+            try:
+                page = page_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            with self._timed('list'):
+                videos = await self.scraper.fetch_tiktok_page(page, self.params, self.headers)
+            if videos:
+                await list_queue.put(videos)
+                print(f"Pagina {page}/{self.pages} completata")
+            await asyncio.sleep(CONFIG['DELAY'])
+        await list_queue.put(_DONE)
+
+    async def _select_top_k(self, list_queue: asyncio.Queue, list_workers: int) -> List[Dict]:
+        """
+        Tiene solo i K video più recenti (item_id più alto) senza duplicati.
+
+        La classifica è definitiva solo dopo l'ultima pagina, quindi i video
+        vengono restituiti appena l'elenco è completo.
+        """
+        heap: List[Tuple[int, Dict]] = []
+        seen = set()
+        finished = 0
+        while finished < list_workers:
+            videos = await list_queue.get()
+            if videos is _DONE:
+                finished += 1
+                continue
+            with self._timed('top_k'):
+                for video in videos:
+                    item_id = int(video['item_id'])
+                    if item_id in seen:
+                        continue
+                    seen.add(item_id)
+                    entry = (item_id, video)
+                    if len(heap) < self.output_videos:
+                        heapq.heappush(heap, entry)
+                    elif item_id > heap[0][0]:
+                        heapq.heapreplace(heap, entry)
+
+        self.total_videos = len(seen)
+        print(f"\nTotale video trovati: {self.total_videos}")
+
+        top_videos = [video for _, video in sorted(heap, key=lambda x: x[0], reverse=True)]
+        self.selected_videos = len(top_videos)
+        if top_videos:
+            print(f"\nInizio analisi dettagliata dei {self.selected_videos} video più recenti "
+                  f"tra i {self.total_videos} video trovati...\n")
+        return top_videos
+
+    def _split_cached(self, top_videos: List[Dict]) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, str, str]]]:
+        """
+        Separa i video con dati dettagliati in cache (pagina invariata) da
+        quelli da analizzare, come (posizione, item_id, url)
+        """
+        cached, pending = [], []
+        for rank, video in enumerate(top_videos, 1):
+            video_data = self.scraper.response_cache.cached_details(video['item_id'])
+            if video_data is not None:
+                cached.append((rank, video_data))
+            else:
+                pending.append((rank, str(video['item_id']), video['item_url']))
+        if cached:
+            print(f"Video con dati in cache (pagina invariata): {len(cached)}")
+        return cached, pending
+
+    def _store_details(self, item_id: str, url: str, video_data: Dict):
+        """Mette in cache i dati del video; i segnaposto no, la pagina può tornare disponibile"""
+        if video_data != self.scraper.unavailable_video(url):
+            self.scraper.response_cache.store_details(item_id, video_data)
+
+    async def _top_k(self, list_queue: asyncio.Queue, detail_queue: asyncio.Queue,
+                     result_queue: asyncio.Queue, list_workers: int, detail_workers: int):
+        """Inoltra i video selezionati ai detail worker, quelli già in cache al sink"""
+        top_videos = await self._select_top_k(list_queue, list_workers)
+        cached, pending = self._split_cached(top_videos)
+        for item in cached:
+            await result_queue.put(item)
+        for item in pending:
+            await detail_queue.put(item)
+        for _ in range(detail_workers):
+            await detail_queue.put(_DONE)
+
+    async def _sharded_details(self, list_queue: asyncio.Queue, result_queue: asyncio.Queue,
+                               list_workers: int, processes: int):
+        """Analizza i video selezionati su più processi (vedi sharding.ShardedExtractor)"""
+        top_videos = await self._select_top_k(list_queue, list_workers)
+        cached, pending = self._split_cached(top_videos)
+        for item in cached:
+            await result_queue.put(item)
+        pending_by_rank = {rank: (item_id, url) for rank, item_id, url in pending}
+        extractor = ShardedExtractor(processes)
+        # I processi figli non sono misurabili da qui: lo stadio viene misurato per intero
+        with self._timed('detail'):
+            async for rank, video_data in extractor.run([(rank, url) for rank, _, url in pending]):
+                if video_data:
+                    self._store_details(*pending_by_rank[rank], video_data)
+                    await result_queue.put((rank, video_data))
+                    print(f"Video {rank} analizzato con successo")
+                else:
+                    print(f"Non è stato possibile analizzare il video {rank}")
+        await result_queue.put(_DONE)
+
+    async def _detail_worker(self, detail_queue: asyncio.Queue, result_queue: asyncio.Queue):
+        """Analizza in dettaglio i video selezionati"""
+        while True:
+            item = await detail_queue.get()
+            if item is _DONE:
+                break
+            rank, item_id, url = item
+            print(f"\nAnalisi video {rank}/{self.selected_videos}: {url}")
+            with self._timed('detail'):
+                video_data = await self.scraper.extract_video_data(url)
+            if video_data:
+                self._store_details(item_id, url, video_data)
+                await result_queue.put((rank, video_data))
+                print(f"Video {rank} analizzato con successo")
+            else:
+                print(f"Non è stato possibile analizzare questo video")
+            await asyncio.sleep(CONFIG['DELAY'])
+        await result_queue.put(_DONE)
+
+    async def _sink(self, result_queue: asyncio.Queue, results: Dict[int, Dict], detail_workers: int):
+        """Raccoglie i risultati man mano che arrivano"""
+        finished = 0
+        while finished < detail_workers:
+            item = await result_queue.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            rank, video_data = item
+            with self._timed('sink'):
+                results[rank] = video_data
+                if self.on_result:
+                    self.on_result(rank, video_data)
@@ -0,0 +1,300 @@
+"""
+Server HTTP asincrono minimale per l'anteprima locale dei file generati
+"""
+from typing import Dict, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from urllib.parse import unquote
+from config import CONFIG, SERVER_CONFIG
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Nomi con hash del contenuto (es. app.3f9c2a1b.js): possono essere messi in cache per sempre
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+STATUS_TEXT = {
+    200: 'OK', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 416: 'Range Not Satisfiable',
+}
+
+# Varianti precompresse in ordine di preferenza: (encoding, estensione)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Codifiche di Accept-Encoding con il loro q-value (q=0 significa rifiutata)"""
+    codings = {}
+    for part in value.split(','):
+        name, *params = [item.strip() for item in part.split(';')]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, number = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        codings[name.lower()] = q
+    return codings
+
+def choose_encoding(accept_encoding: str, available) -> Optional[str]:
+    """
+    Variante precompressa da inviare, None per il contenuto non compresso.
+    Vince il q-value più alto (a parità l'ordine di ENCODINGS); le codifiche
+    non elencate valgono quanto '*' se presente; identity viene preferita
+    solo se elencata con un q-value più alto.
+    """
+    codings = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for name, _ in ENCODINGS:
+        q = codings.get(name, codings.get('*', 0.0))
+        if name in available and q > best_q:
+            best, best_q = name, q
+    if best is not None and codings.get('identity', 0.0) > best_q:
+        return None
+    return best
+
+def is_private(name: str) -> bool:
+    """File e cartelle da non servire né comprimere (.git, cache, virtualenv, ...)"""
+    return name.startswith(('.', '__')) or name in ('venv', 'profiles')
+
+def precompress(root: str, extensions: Tuple[str, ...]) -> int:
+    """
+    Crea accanto ai file di testo le varianti .gz (e .br se il pacchetto
+    brotli è installato), solo se mancano o sono più vecchie dell'originale.
+
+    Returns:
+        Il numero di varianti create
+    """
+    created = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not is_private(d)]
+        for filename in filenames:
+            if is_private(filename) or not filename.endswith(extensions):
+                continue
+            path = os.path.join(dirpath, filename)
+            mtime = os.path.getmtime(path)
+            with open(path, 'rb') as f:
+                content = f.read()
+            variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            for extension, compress in variants:
+                target = path + extension
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compress(content))
+                created += 1
+    return created
+
+class StaticFile:
+    """
+    Contenuto di un file con varianti precompresse, in memoria. Ogni
+    codifica ha il proprio ETag forte: i byte inviati sono diversi.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            self.content = f.read()
+        self.digest = hashlib.sha256(self.content).hexdigest()[:32]
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'application/json'):
+            self.content_type += '; charset=utf-8'
+        self.variants: Dict[str, bytes] = {}
+        for encoding, extension in ENCODINGS:
+            variant = path + extension
+            if os.path.exists(variant) and os.path.getmtime(variant) >= self.mtime:
+                with open(variant, 'rb') as f:
+                    self.variants[encoding] = f.read()
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """ETag della rappresentazione: identity oppure la variante indicata"""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    @property
+    def cache_control(self) -> str:
+        if HASHED_NAME.search(os.path.basename(self.path)):
+            return 'public, max-age=31536000, immutable'
+        return 'no-cache'
+
+class PreviewServer:
+    """
+    Serve i file generati di una cartella (solo le estensioni in
+    SERVED_EXTENSIONS, così sorgenti, configurazione e fixture restano
+    privati) con:
+    - varianti .br/.gz precompresse scelte in base ad Accept-Encoding
+    - ETag forti per ogni codifica e risposte 304 per If-None-Match
+    - Cache-Control immutable per i file con hash nel nome
+    - richieste Range (un solo intervallo) sul contenuto non compresso
+    - connessioni keep-alive HTTP/1.1
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**SERVER_CONFIG, **(config or {})}
+        root = self.config['ROOT'] or os.path.dirname(CONFIG['LOCAL_FILENAME']) or '.'
+        self.root = os.path.realpath(root)
+        self.extensions = tuple(self.config['SERVED_EXTENSIONS'])
+        self._files: Dict[str, StaticFile] = {}
+
+    def _resolve(self, target: str) -> Optional[str]:
+        """Percorso del file richiesto, None se esce dalla cartella servita"""
+        path = unquote(target.split('?', 1)[0].split('#', 1)[0])
+        if path.endswith('/'):
+            path += os.path.basename(CONFIG['LOCAL_FILENAME'])
+        if any(is_private(part) for part in path.split('/') if part) or not path.endswith(self.extensions):
+            return None
+        full_path = os.path.realpath(os.path.join(self.root, path.lstrip('/')))
+        if os.path.commonpath([self.root, full_path]) != self.root or not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    def _load(self, path: str) -> StaticFile:
+        """File dalla cache in memoria, ricaricato se modificato su disco"""
+        static_file = self._files.get(path)
+        if static_file is None or os.path.getmtime(path) != static_file.mtime:
+            static_file = StaticFile(path)
+            self._files[path] = static_file
+        return static_file
+
+    @staticmethod
+    def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+        """Intervallo [start, end] richiesto, None se non soddisfacibile"""
+        match = RANGE_PATTERN.match(value.strip())
+        if not match or not any(match.groups()):
+            return None
+        start, end = match.groups()
+        if not start:
+            length = int(end)
+            if length == 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start >= size or start > end:
+            return None
+        return start, end
+
+    def build_response(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, header e body per una richiesta"""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b''
+
+        path = self._resolve(target)
+        if path is None:
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'Not Found'
+
+        static_file = self._load(path)
+
+        # Le richieste Range si applicano al contenuto non compresso
+        encoding = None
+        if 'range' not in headers:
+            encoding = choose_encoding(headers.get('accept-encoding', ''), static_file.variants)
+
+        etag = static_file.etag(encoding)
+        response_headers = {
+            'Content-Type': static_file.content_type,
+            'ETag': etag,
+            'Cache-Control': static_file.cache_control,
+            'Accept-Ranges': 'bytes',
+            'Vary': 'Accept-Encoding',
+        }
+
+        if_none_match = headers.get('if-none-match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return 304, response_headers, b''
+
+        if encoding:
+            response_headers['Content-Encoding'] = encoding
+            return 200, response_headers, static_file.variants[encoding]
+
+        body = static_file.content
+        if 'range' in headers:
+            byte_range = self._parse_range(headers['range'], len(body))
+            if byte_range is None:
+                response_headers['Content-Range'] = f"bytes */{len(body)}"
+                return 416, response_headers, b''
+            start, end = byte_range
+            response_headers['Content-Range'] = f"bytes {start}-{end}/{len(body)}"
+            return 206, response_headers, body[start:end + 1]
+        return 200, response_headers, body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, 'HEAD', 400, {}, b'', keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                status, response_headers, body = self.build_response(method, target, headers)
+                if status == 405:
+                    # Un eventuale body della richiesta non viene letto: la connessione non è riutilizzabile
+                    keep_alive = False
+                await self._write(writer, method, status, response_headers, body, keep_alive)
+                print(f"{method} {target} {status} {len(body)}")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, method: str, status: int,
+                     headers: Dict[str, str], body: bytes, keep_alive: bool):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+        headers = {
+            **headers,
+            'Date': formatdate(usegmt=True),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        # Un 304 non ha body: Content-Length sarebbe quella della risposta 200
+        if status != 304:
+            headers['Content-Length'] = str(len(body))
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD' and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+    async def serve(self):
+        """Avvia il server e resta in ascolto"""
+        if self.config['PRECOMPRESS']:
+            created = precompress(self.root, tuple(self.config['COMPRESSIBLE']))
+            print(f"Varianti precompresse create: {created}{'' if brotli else ' (solo gzip, brotli non installato)'}")
+
+        server = await asyncio.start_server(self.handle_connection, self.config['HOST'], self.config['PORT'])
+        print(f"Anteprima disponibile su http://{self.config['HOST']}:{self.config['PORT']}/ (cartella {self.root})")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(PreviewServer().serve())
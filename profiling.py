@@ -0,0 +1,114 @@
+"""
+Strumenti di profilazione attivabili da PROFILING_CONFIG
+"""
+from contextlib import contextmanager
+from typing import Dict, Optional
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from config import PROFILING_CONFIG
+
+class Profiler:
+    """
+    Profilazione per fasi (autenticazione, pipeline, generazione HTML).
+
+    cProfile e tracemalloc misurano tutto il thread: con la pipeline asincrona
+    una fase include tutti i task attivi in quel momento, per questo le fasi
+    vanno usate in sequenza e non annidate. Gli stadi della pipeline (lista,
+    top-K, dettagli, output) si sovrappongono nello stesso thread e hanno un
+    unico .prof: per ognuno report_stages riporta i tempi misurati dalla
+    pipeline stessa.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = {**PROFILING_CONFIG, **(config or {})}
+        self.enabled = any(self.config[k] for k in ('TRACEMALLOC', 'CPROFILE', 'MARKERS'))
+        self._last_snapshot = None
+        self._started_tracemalloc = False
+
+        if self.enabled:
+            os.makedirs(self.config['OUTPUT_DIR'], exist_ok=True)
+        if self.config['TRACEMALLOC'] and not tracemalloc.is_tracing():
+            tracemalloc.start(self.config['TRACEMALLOC_FRAMES'])
+            self._started_tracemalloc = True
+            self._last_snapshot = tracemalloc.take_snapshot()
+
+    def close(self):
+        """Ferma tracemalloc se è stato avviato dal profiler"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._last_snapshot = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.config['OUTPUT_DIR'], name)
+
+    def _marker(self, text: str):
+        print(f"[profilo] {time.perf_counter():.3f} pid={os.getpid()} {text}", file=sys.stderr, flush=True)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profila il blocco come fase con il nome indicato"""
+        if not self.enabled:
+            yield
+            return
+
+        thread = threading.current_thread()
+        thread_name = thread.name
+        profile = None
+        start = time.perf_counter()
+
+        if self.config['MARKERS']:
+            # py-spy dump mostra il nome del thread: indica la fase in corso
+            thread.name = f"{thread_name}[{name}]"
+            self._marker(f">>> {name}")
+        if self.config['CPROFILE']:
+            profile = cProfile.Profile()
+            profile.enable()
+
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self._path(f"{name}.prof"))
+            if self.config['TRACEMALLOC']:
+                self._write_snapshot(name)
+            if self.config['MARKERS']:
+                self._marker(f"<<< {name} ({time.perf_counter() - start:.2f}s)")
+                thread.name = thread_name
+
+    def _write_snapshot(self, name: str):
+        """Salva le allocazioni cresciute durante la fase e il picco di memoria"""
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        stats = snapshot.compare_to(self._last_snapshot, 'lineno') if self._last_snapshot else \
+            snapshot.statistics('lineno')
+        with open(self._path(f"{name}.tracemalloc.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"Memoria tracciata: {current} bytes, picco: {peak} bytes\n\n")
+            for stat in stats[:self.config['TRACEMALLOC_TOP']]:
+                f.write(f"{stat}\n")
+        print(f"[profilo] {name}: memoria tracciata {current} bytes, picco {peak} bytes")
+        self._last_snapshot = snapshot
+        tracemalloc.reset_peak()
+
+    def report_stages(self, stage_stats: Dict[str, Dict[str, float]]):
+        """
+        Salva i tempi dei singoli stadi della pipeline: elementi elaborati,
+        tempo occupato (somma sui worker) e intervallo di attività
+        """
+        if not self.enabled or not stage_stats:
+            return
+        lines = []
+        for stage, stats in stage_stats.items():
+            lines.append(
+                f"{stage}: {stats['items']} elementi, occupato {stats['busy']:.2f}s, "
+                f"attivo da {stats['first']:.2f}s a {stats['last']:.2f}s"
+            )
+        with open(self._path('pipeline_stages.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        for line in lines:
+            print(f"[profilo] {line}")
@@ -0,0 +1,163 @@
+"""
+Registrazione e riproduzione offline delle risposte HTTP e dei parametri di autenticazione
+"""
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import random
+import zipfile
+import httpx
+from config import REPLAY_CONFIG
+
+def request_key(request: httpx.Request) -> str:
+    """Chiave stabile della richiesta: metodo e URL con parametri ordinati"""
+    url = request.url.copy_with(query=None)
+    query = '&'.join(f"{k}={v}" for k, v in sorted(request.url.params.multi_items()))
+    return f"{request.method} {url}?{query}" if query else f"{request.method} {url}"
+
+class FixtureArchive:
+    """
+    Archivio zip con le risposte registrate:
+    - index.json: parametri di autenticazione e, per ogni chiave, status e header
+    - bodies/<sha256>: body così come arrivato dalla rete (ancora compresso)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.auth_params: Optional[Dict[str, str]] = None
+        self.entries: Dict[str, Dict] = {}
+        self.bodies: Dict[str, bytes] = {}
+
+    def load(self) -> 'FixtureArchive':
+        with zipfile.ZipFile(self.path) as archive:
+            index = json.loads(archive.read('index.json'))
+            self.auth_params = index['auth']
+            self.entries = index['entries']
+            for entry in self.entries.values():
+                if entry['body'] not in self.bodies:
+                    self.bodies[entry['body']] = archive.read(entry['body'])
+        return self
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('index.json', json.dumps(
+                {'auth': self.auth_params, 'entries': self.entries}, indent=1, sort_keys=True
+            ))
+            for name, body in self.bodies.items():
+                archive.writestr(name, body)
+        os.replace(tmp_path, self.path)
+
+    def add(self, key: str, status: int, headers: List[Tuple[str, str]], body: bytes):
+        name = f"bodies/{hashlib.sha256(body).hexdigest()}"
+        self.bodies[name] = body
+        self.entries[key] = {'status': status, 'headers': headers, 'body': name}
+
+    def get(self, key: str) -> Optional[Tuple[int, List[Tuple[str, str]], bytes]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry['status'], [tuple(h) for h in entry['headers']], self.bodies[entry['body']]
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Inoltra le richieste al trasporto reale e ne salva le risposte nell'archivio"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, archive: FixtureArchive):
+        self.inner = inner
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        # Lo stream grezzo (ancora compresso): aiter_raw() fallisce se il trasporto
+        # interno restituisce una risposta già letta, come ReplayTransport
+        body = b''.join([chunk async for chunk in response.stream])
+        await response.aclose()
+        headers = [(k, v) for k, v in response.headers.multi_items()]
+        self.archive.add(request_key(request), response.status_code, headers, body)
+        return httpx.Response(response.status_code, headers=headers, content=body,
+                              request=request, extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serve le risposte dall'archivio con latenza ed errori simulati.
+
+    Ritardi ed errori dipendono solo da seed, chiave della richiesta e numero
+    di volte in cui quella richiesta è stata fatta: l'esito è lo stesso a
+    ogni esecuzione, indipendentemente dall'ordine delle richieste concorrenti.
+    """
+
+    def __init__(self, archive: FixtureArchive, config: Optional[Dict] = None):
+        self.archive = archive
+        self.config = {**REPLAY_CONFIG, **(config or {})}
+        self._attempts: Dict[str, int] = {}
+        self.missing = 0
+
+    def _rng(self, key: str) -> random.Random:
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        return random.Random(f"{self.config['SEED']}:{key}:{attempt}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        rng = self._rng(key)
+
+        jitter = self.config['LATENCY_JITTER']
+        latency = max(0.0, self.config['LATENCY'] + rng.uniform(-jitter, jitter))
+        if latency:
+            await asyncio.sleep(latency)
+
+        if rng.random() < self.config['CONNECTION_ERROR_RATE']:
+            raise httpx.ConnectError(f"Errore di connessione simulato: {key}", request=request)
+        if rng.random() < self.config['ERROR_RATE']:
+            return httpx.Response(self.config['ERROR_STATUS'], request=request)
+
+        recorded = self.archive.get(key)
+        if recorded is None:
+            self.missing += 1
+            print(f"Nessuna risposta registrata per {key}")
+            return httpx.Response(404, request=request)
+        status, headers, body = recorded
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+class ReplaySession:
+    """Collega archivio e trasporto secondo REPLAY_CONFIG['MODE']"""
+
+    def __init__(self, mode: str, config: Optional[Dict] = None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modalità di replay non valida: {mode}")
+        self.mode = mode
+        self.config = {**REPLAY_CONFIG, **(config or {})}
+        self.archive = FixtureArchive(self.config['ARCHIVE'])
+        if mode == 'replay':
+            self.archive.load()
+            print(f"Replay da {self.config['ARCHIVE']}: {len(self.archive.entries)} risposte registrate")
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None) -> Optional['ReplaySession']:
+        """Sessione configurata, o None se la modalità è disattivata"""
+        mode = {**REPLAY_CONFIG, **(config or {})}['MODE']
+        return cls(mode, config) if mode else None
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    def transport_options(self) -> Dict:
+        """Argomenti per HTTPTransport"""
+        if self.recording:
+            return {'transport_wrapper': lambda inner: RecordingTransport(inner, self.archive)}
+        return {'transport': ReplayTransport(self.archive, self.config)}
+
+    def save(self):
+        """Salva l'archivio registrato"""
+        if self.recording:
+            self.archive.save()
+            print(f"Registrate {len(self.archive.entries)} risposte in {self.config['ARCHIVE']}")
@@ -1,8 +1,8 @@
 import asyncio
 import os
-from ftplib import FTP
+from ftplib import FTP, error_perm
 from main import main
-from config import CONFIG
+from config import CONFIG, ASSETS_CONFIG
 
 # Configurazione FTP
 FTP_CONFIG = {
@@ -41,6 +41,9 @@ def upload_to_ftp(local_file):
             for f in files_before:
                 print(f"- {f}")
             
+            # Prima gli asset con hash nel nome, così la nuova pagina non punta a file mancanti
+            upload_assets(ftp, os.path.dirname(local_file))
+
             # Carica il file
             print(f"\nInizio caricamento di {local_file}...")
             with open(local_file, 'rb') as f:
@@ -65,6 +68,39 @@ def upload_to_ftp(local_file):
         print(f"\nErrore durante l'upload FTP: {str(e)}")
         raise
 
+def upload_assets(ftp, output_dir):
+    """
+    Carica la cartella degli asset generati da AssetBuilder e la pagina dei trend.
+    I file con hash nel nome già presenti sul server non vengono ricaricati.
+    """
+    assets_dir = os.path.join(output_dir, ASSETS_CONFIG['ASSETS_DIR'])
+    if not os.path.isdir(assets_dir):
+        return
+
+    remote_assets = ASSETS_CONFIG['ASSETS_DIR']
+    if remote_assets not in ftp.nlst():
+        print(f"\nCreazione directory {remote_assets} sul server...")
+        ftp.mkd(remote_assets)
+    try:
+        existing = set(os.path.basename(f) for f in ftp.nlst(remote_assets))
+    except error_perm:
+        # Alcuni server rispondono 550 per una directory vuota
+        existing = set()
+
+    for filename in sorted(os.listdir(assets_dir)):
+        # Le varianti .gz/.br servono solo al server di anteprima locale
+        if filename in existing or filename.endswith(('.gz', '.br')):
+            continue
+        print(f"Caricamento asset {filename}...")
+        with open(os.path.join(assets_dir, filename), 'rb') as f:
+            ftp.storbinary(f'STOR {remote_assets}/{filename}', f)
+
+    trend_page = os.path.join(output_dir, ASSETS_CONFIG['TREND_OUTPUT'])
+    if os.path.exists(trend_page):
+        print(f"Caricamento pagina trend {ASSETS_CONFIG['TREND_OUTPUT']}...")
+        with open(trend_page, 'rb') as f:
+            ftp.storbinary(f'STOR {ASSETS_CONFIG["TREND_OUTPUT"]}', f)
+
 async def run():
     try:
         # Esegui lo script principale
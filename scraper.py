@@ -2,22 +2,55 @@
 Gestione dello scraping dei video TikTok
 """
 from typing import List, Dict, Optional
-import pyktok as pyk
 import json
-import time
-import requests
+from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
 import asyncio
-from config import CONFIG, BROWSER_CONFIG, API_CONFIG
+from config import CONFIG, BROWSER_CONFIG, API_CONFIG, MEMORY_CONFIG
+from transport import HTTPTransport
+from http_cache import ResponseCache
+from memory_budget import ByteBudget
+from replay import ReplaySession
+
+REHYDRATION_MARKER = b'id="__UNIVERSAL_DATA_FOR_REHYDRATION__"'
 
 class TikTokScraper:
-    def __init__(self):
+    def __init__(self, transport: Optional[HTTPTransport] = None,
+                 response_cache: Optional[ResponseCache] = None):
         self.config = CONFIG
         self.browser_config = BROWSER_CONFIG
         self.api_config = API_CONFIG
+        # Registrazione/riproduzione offline (REPLAY_CONFIG['MODE'])
+        self.replay = ReplaySession.from_config()
+        # Trasporto condiviso da liste e dettagli (connessioni keep-alive riutilizzate)
+        self.transport = transport or HTTPTransport(
+            **(self.replay.transport_options() if self.replay else {})
+        )
+        # Cache ETag/Last-Modified/hash del body delle pagine della lista.
+        # Disattivata in record/replay: le risposte 304 non sono riproducibili
+        self.response_cache = response_cache or ResponseCache({'ENABLED': False} if self.replay else None)
+        self.memory_config = MEMORY_CONFIG
+        self.byte_budget = ByteBudget(self.memory_config['MAX_INFLIGHT_BYTES'])
+
+    async def close(self):
+        """Chiude le connessioni del trasporto HTTP e salva la cache delle risposte"""
+        await self.transport.aclose()
+        self.response_cache.save()
+        if self.replay:
+            self.replay.save()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def extract_auth_params(self) -> Optional[Dict[str, str]]:
         """Estrae i parametri di autenticazione necessari"""
+        if self.replay and not self.replay.recording:
+            # In replay non serve Chromium: si usano i parametri registrati
+            return self.replay.archive.auth_params
+
         for attempt in range(self.config['MAX_AUTH_RETRIES']):
             target_params = None
             request_event = asyncio.Event()
@@ -56,6 +89,8 @@ class TikTokScraper:
                         
                         if target_params:
                             print("Parametri di autenticazione estratti con successo!")
+                            if self.replay:
+                                self.replay.archive.auth_params = target_params
                             return target_params
                             
                     except Exception as e:
@@ -72,22 +107,34 @@ class TikTokScraper:
         print("Impossibile ottenere i parametri di autenticazione dopo tutti i tentativi")
         return None
 
-    def fetch_tiktok_page(self, page: int, params: Dict, headers: Dict) -> List[Dict]:
+    async def fetch_tiktok_page(self, page: int, params: Dict, headers: Dict) -> List[Dict]:
         """Recupera una singola pagina di video"""
         params = params.copy()
         params['page'] = str(page)
+        cache_key = self.response_cache.make_key(self.api_config['trend_list_url'], params)
 
         try:
-            response = requests.get(
+            response = await self.transport.get(
                 self.api_config['trend_list_url'],
-                headers=headers,
-                params=params,
-                timeout=7
+                headers={**headers, **self.response_cache.conditional_headers(cache_key)},
+                params=params
             )
+            if response.status_code == 304:
+                videos = self.response_cache.not_modified(cache_key)
+                if videos is not None:
+                    print(f"Pagina {page} non modificata (cache)")
+                    return videos
+                return []
             if response.status_code == 200:
+                # Body identico all'ultima volta: niente parsing del JSON
+                videos = self.response_cache.lookup_body(cache_key, response.content)
+                if videos is not None:
+                    print(f"Pagina {page} invariata (cache)")
+                    return videos
                 data = response.json()
                 if 'data' in data and isinstance(data['data'], dict):
                     videos = data['data'].get('videos', [])
+                    self.response_cache.store(cache_key, response.content, response.headers, videos)
                     print(f"Pagina {page} caricata")
                     return videos
                 return []
@@ -95,20 +142,64 @@ class TikTokScraper:
             print(f"Errore pagina {page}: {str(e)}")
             return []
 
-    def extract_video_data(self, url: str) -> Optional[Dict]:
+    async def get_tiktok_json(self, url: str) -> Optional[str]:
+        """
+        Scarica la pagina del video ed estrae il JSON di rehydration.
+        Un errore HTTP (es. 429, 5xx) solleva un'eccezione come in
+        read_limited: solo una pagina valida senza JSON restituisce None.
+        """
+        response = await self.transport.get(url, headers=self.browser_config['detail_headers'])
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, "html.parser")
+        tt_script = soup.find('script', attrs={'id': "__UNIVERSAL_DATA_FOR_REHYDRATION__"})
+        if tt_script is None or not tt_script.string:
+            return None
+        return tt_script.string
+
+    @staticmethod
+    def unavailable_video(url: str) -> Dict:
+        """Dati segnaposto per un video senza JSON di rehydration"""
+        return {
+            'titolo': 'Video non disponibile',
+            'creator': 'N/A',
+            'url': url,
+            'views': 'N/A',
+            'categorie': 'N/A',
+            'keywords': 'N/A'
+        }
+
+    def parse_video_fields(self, url: str, tt_json: Dict) -> Dict:
+        """Estrae i campi usati nell'output dal JSON di rehydration"""
+        default_scope = tt_json.get('__DEFAULT_SCOPE__', {})
+        webapp_detail = default_scope.get('webapp.video-detail', {})
+        item_info = webapp_detail.get('itemInfo', {}).get('itemStruct', {})
+        
+        stats = item_info.get('stats', {})
+        views = stats.get('playCount', 'N/A') if isinstance(stats, dict) else 'N/A'
+        views_formatted = self.format_number(views) if views != 'N/A' else 'N/A'
+        
+        div_labels = item_info.get('diversificationLabels', [])
+        sug_words = item_info.get('suggestedWords', [])
+        
+        return {
+            'titolo': item_info.get('desc', 'N/A'),
+            'creator': item_info.get('author', {}).get('nickname', 'N/A'),
+            'url': url,
+            'views': views_formatted,
+            'categorie': ', '.join(div_labels) if div_labels else 'N/A',
+            'keywords': ', '.join(sug_words) if sug_words else 'N/A'
+        }
+
+    async def extract_video_data(self, url: str) -> Optional[Dict]:
         """Estrae i dati di un singolo video"""
+        if self.memory_config['BOUNDED_DETAIL']:
+            return await self.extract_video_data_bounded(url)
+
         try:
-            tt_json = pyk.alt_get_tiktok_json(url)
+            tt_json = await self.get_tiktok_json(url)
             
             if tt_json is None:
-                return {
-                    'titolo': 'Video non disponibile',
-                    'creator': 'N/A',
-                    'url': url,
-                    'views': 'N/A',
-                    'categorie': 'N/A',
-                    'keywords': 'N/A'
-                }
+                return self.unavailable_video(url)
             
             if isinstance(tt_json, str):
                 try:
@@ -116,30 +207,58 @@ class TikTokScraper:
                 except json.JSONDecodeError:
                     return None
 
-            default_scope = tt_json.get('__DEFAULT_SCOPE__', {})
-            webapp_detail = default_scope.get('webapp.video-detail', {})
-            item_info = webapp_detail.get('itemInfo', {}).get('itemStruct', {})
-            
-            stats = item_info.get('stats', {})
-            views = stats.get('playCount', 'N/A') if isinstance(stats, dict) else 'N/A'
-            views_formatted = self.format_number(views) if views != 'N/A' else 'N/A'
-            
-            div_labels = item_info.get('diversificationLabels', [])
-            sug_words = item_info.get('suggestedWords', [])
-            
-            return {
-                'titolo': item_info.get('desc', 'N/A'),
-                'creator': item_info.get('author', {}).get('nickname', 'N/A'),
-                'url': url,
-                'views': views_formatted,
-                'categorie': ', '.join(div_labels) if div_labels else 'N/A',
-                'keywords': ', '.join(sug_words) if sug_words else 'N/A'
-            }
+            return self.parse_video_fields(url, tt_json)
             
         except Exception as e:
             print(f"Errore nell'estrazione dei dati per {url}: {str(e)}")
             return None
 
+    @staticmethod
+    def find_rehydration_script(body: bytes) -> Optional[bytes]:
+        """Individua il contenuto dello script di rehydration senza costruire il DOM"""
+        marker = body.find(REHYDRATION_MARKER)
+        if marker == -1:
+            return None
+        start = body.find(b'>', marker) + 1
+        end = body.find(b'</script>', start)
+        if start == 0 or end == -1:
+            return None
+        return body[start:end]
+
+    async def extract_video_data_bounded(self, url: str) -> Optional[Dict]:
+        """
+        Variante a memoria limitata: le pagine in corso sono limitate in byte
+        da MAX_INFLIGHT_BYTES, niente BeautifulSoup e il JSON grezzo viene
+        rilasciato appena estratti i campi.
+
+        Prima del download viene riservato MAX_PAGE_BYTES, il massimo che
+        read_limited può accumulare, quindi il limite vale anche durante lo
+        streaming. Scaricata la pagina, la prenotazione scende alla sua
+        dimensione reale per il tempo dell'analisi.
+        """
+        reserved = self.memory_config['MAX_PAGE_BYTES']
+        await self.byte_budget.acquire(reserved)
+        try:
+            body = await self.transport.read_limited(
+                url, reserved, headers=self.browser_config['detail_headers']
+            )
+            await self.byte_budget.resize(reserved, len(body))
+            reserved = len(body)
+
+            raw_json = self.find_rehydration_script(body)
+            del body
+            if raw_json is None:
+                return self.unavailable_video(url)
+            tt_json = json.loads(raw_json)
+            del raw_json
+            return self.parse_video_fields(url, tt_json)
+        except Exception as e:
+            # Solo il messaggio: il traceback terrebbe in vita i frame con il JSON
+            print(f"Errore nell'estrazione dei dati per {url}: {str(e)}")
+            return None
+        finally:
+            await self.byte_budget.release(reserved)
+
     @staticmethod
     def format_number(num):
         """Formatta i numeri con i separatori delle migliaia"""
@@ -154,6 +273,7 @@ def save_video_data(videos_data, output_filename):
         json.dump(videos_data, f, ensure_ascii=False, indent=4)
 
 async def run():
+    scraper = None
     try:
         # Inizializza lo scraper
         scraper = TikTokScraper()
@@ -184,11 +304,11 @@ async def run():
         # Recupera tutti i video
         all_videos = []
         for page in range(1, CONFIG['PAGES_TO_ANALYZE'] + 1):
-            videos = scraper.fetch_tiktok_page(page, params, headers)
+            videos = await scraper.fetch_tiktok_page(page, params, headers)
             if videos:
                 all_videos.extend(videos)
                 print(f"Pagina {page}/{CONFIG['PAGES_TO_ANALYZE']} completata")
-            time.sleep(CONFIG['DELAY'])
+            await asyncio.sleep(CONFIG['DELAY'])
 
         total_videos = len(all_videos)
         print(f"\nTotale video trovati: {total_videos}")
@@ -208,14 +328,14 @@ async def run():
                 url = video['item_url']
                 print(f"\nAnalisi video {idx}/{output_videos}: {url}")
                 
-                video_data = scraper.extract_video_data(url)
+                video_data = await scraper.extract_video_data(url)
                 if video_data:
                     videos_data.append(video_data)
                     print(f"Video {idx} analizzato con successo")
                 else:
                     print(f"Non è stato possibile analizzare questo video")
                 
-                time.sleep(CONFIG['DELAY'])
+                await asyncio.sleep(CONFIG['DELAY'])
 
             # Salva i dati dei video in un file JSON
             video_data_file = 'video_data.json'
@@ -246,6 +366,9 @@ async def run():
         print("\nStack trace completo:")
         print(traceback.format_exc())
         raise
+    finally:
+        if scraper:
+            await scraper.close()
 
 if __name__ == "__main__":
     asyncio.run(run())
@@ -0,0 +1,159 @@
+"""
+Indice invertito per cercare e filtrare i video raccolti
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+import json
+import os
+import re
+import unicodedata
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+MIN_TOKEN_LENGTH = 2
+
+# Campi a valore esatto usati come filtri (facet) nella pagina
+FACETS = ('creator', 'categories', 'keywords')
+
+def normalize(text: str) -> str:
+    """Minuscolo e senza segni diacritici (categoria Unicode M, come /\\p{M}/u lato JavaScript)"""
+    text = unicodedata.normalize('NFD', text.lower())
+    return ''.join(c for c in text if not unicodedata.category(c).startswith('M'))
+
+def sort_key(token: str) -> bytes:
+    """
+    Ordine delle unità UTF-16, lo stesso del confronto tra stringhe in
+    JavaScript (diverso dall'ordine dei code point per i caratteri oltre U+FFFF)
+    """
+    return token.encode('utf-16-be')
+
+def tokenize(text: str) -> List[str]:
+    """Divide il testo in token normalizzati"""
+    return [t for t in TOKEN_PATTERN.findall(normalize(text)) if len(t) >= MIN_TOKEN_LENGTH]
+
+def encode_postings(doc_ids: Iterable[int]) -> List[int]:
+    """Posting list ordinata codificata a differenze (numeri piccoli, JSON compatto)"""
+    encoded, previous = [], 0
+    for doc_id in sorted(set(doc_ids)):
+        encoded.append(doc_id - previous)
+        previous = doc_id
+    return encoded
+
+def decode_postings(encoded: List[int]) -> List[int]:
+    decoded, current = [], 0
+    for delta in encoded:
+        current += delta
+        decoded.append(current)
+    return decoded
+
+def intersect(a: List[int], b: List[int]) -> List[int]:
+    """Intersezione di due posting list ordinate"""
+    result, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            result.append(a[i])
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def build_index(videos: List[Dict]) -> Dict:
+    """
+    Costruisce l'indice sui video nel formato della pagina (title, creator,
+    categories, keywords). L'id di documento è la posizione nella lista.
+
+    - vocabulary: token di titolo, keyword, categorie e creator, ordinati
+      per la ricerca binaria dei prefissi
+    - postings: posting list dei token, parallele a vocabulary
+    - facets (creator / categories / keywords): valori esatti per i filtri
+
+    Il vocabolario è una lista e non un oggetto: in JavaScript le chiavi
+    numeriche di un oggetto ("20", "2024") vengono elencate prima delle altre
+    e in ordine numerico, rompendo l'ordinamento.
+    """
+    text: Dict[str, List[int]] = {}
+    facets: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+
+    for doc_id, video in enumerate(videos):
+        values = {
+            'creator': [video['creator']] if video['creator'] != 'N/A' else [],
+            'categories': video['categories'],
+            'keywords': video['keywords'],
+        }
+        tokens = set(tokenize(video['title']))
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                facets[facet].setdefault(value, []).append(doc_id)
+                tokens.update(tokenize(value))
+        for token in tokens:
+            text.setdefault(token, []).append(doc_id)
+
+    vocabulary = sorted(text, key=sort_key)
+    return {
+        'count': len(videos),
+        'ids': [video['id'] for video in videos],
+        'vocabulary': vocabulary,
+        'postings': [encode_postings(text[token]) for token in vocabulary],
+        'facets': {
+            facet: {value: encode_postings(docs[value]) for value in sorted(docs)}
+            for facet, docs in facets.items()
+        },
+    }
+
+def write_index(index: Dict, output_filename: str):
+    """Salva l'indice in JSON compatto"""
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+
+def index_filename(html_filename: str) -> str:
+    """Nome del file indice accanto all'HTML generato"""
+    return f"{os.path.splitext(html_filename)[0]}.index.json"
+
+class SearchIndex:
+    """API di interrogazione dell'indice"""
+
+    def __init__(self, index: Dict):
+        self.index = index
+        self.count = index['count']
+        self.ids = index['ids']
+        self.vocabulary = index['vocabulary']
+        self.postings = index['postings']
+        self._keys = [sort_key(token) for token in self.vocabulary]
+
+    @classmethod
+    def load(cls, filename: str) -> 'SearchIndex':
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _prefix_postings(self, prefix: str) -> List[int]:
+        """Unione delle posting list dei token che iniziano con prefix"""
+        docs = set()
+        position = bisect_left(self._keys, sort_key(prefix))
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            docs.update(decode_postings(self.postings[position]))
+            position += 1
+        return sorted(docs)
+
+    def search(self, query: Optional[str] = None, creator: Optional[str] = None,
+               category: Optional[str] = None, keyword: Optional[str] = None) -> List[int]:
+        """
+        Posizioni dei video che contengono tutti i token della query (anche
+        come prefisso) e corrispondono ai filtri indicati
+        """
+        result = list(range(self.count))
+        for token in tokenize(query or ''):
+            result = intersect(result, self._prefix_postings(token))
+        for facet, value in (('creator', creator), ('categories', category), ('keywords', keyword)):
+            if value is not None:
+                result = intersect(result, decode_postings(self.index['facets'][facet].get(value, [])))
+        return result
+
+    def search_ids(self, *args, **kwargs) -> List[str]:
+        """Come search, ma restituisce gli id TikTok dei video"""
+        return [self.ids[doc_id] for doc_id in self.search(*args, **kwargs)]
+
+    def facet_values(self, facet: str) -> Dict[str, int]:
+        """Valori di un filtro con il numero di video corrispondenti"""
+        return {value: len(postings) for value, postings in self.index['facets'][facet].items()}
@@ -0,0 +1,182 @@
+"""
+Analisi dettagliata dei video suddivisa su più processi
+"""
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import queue
+import time
+import config
+
+# Campi restituiti da extract_video_data, inviati come tupla per ridurre la serializzazione
+FIELDS = ('titolo', 'creator', 'url', 'views', 'categorie', 'keywords')
+
+# Configurazioni copiate nei processi figli (avviati con spawn, reimportano config)
+SHARED_CONFIGS = ('CONFIG', 'TRANSPORT_CONFIG', 'MEMORY_CONFIG', 'REPLAY_CONFIG', 'PIPELINE_CONFIG')
+
+# Tipi di messaggio sulla coda dei risultati
+RESULT, FAILED, DONE = 'r', 'f', 'd'
+
+def shard_items(items: List[Tuple[int, str]], shards: int) -> List[List[Tuple[int, str]]]:
+    """Distribuisce (posizione, url) a turno tra i processi, così ognuno ha video di tutta la classifica"""
+    return [items[i::shards] for i in range(shards)]
+
+def shard_configs(processes: int) -> Dict[str, Dict]:
+    """
+    Configurazioni per i processi figli. Memoria in volo e ritmo delle
+    richieste sono limiti dell'intera analisi: ogni processo ne riceve una
+    parte, così il totale resta quello configurato.
+    """
+    configs = {name: dict(getattr(config, name)) for name in SHARED_CONFIGS}
+    memory = configs['MEMORY_CONFIG']
+    memory['MAX_INFLIGHT_BYTES'] //= processes
+    if memory['BOUNDED_DETAIL'] and memory['MAX_INFLIGHT_BYTES'] < memory['MAX_PAGE_BYTES']:
+        print(f"Attenzione: con {processes} processi ogni processo ha meno di MAX_PAGE_BYTES, "
+              f"il limite effettivo sale a {processes * memory['MAX_PAGE_BYTES']} bytes")
+    rate = configs['TRANSPORT_CONFIG']['MAX_REQUESTS_PER_SECOND']
+    if rate:
+        configs['TRANSPORT_CONFIG']['MAX_REQUESTS_PER_SECOND'] = rate / processes
+    return configs
+
+def _shard_main(shard_id: int, items: List[Tuple[int, str]], results, stop, configs: Dict[str, Dict]):
+    """Processo figlio: analizza la sua parte di video con un proprio fetcher asincrono"""
+    for name, values in configs.items():
+        getattr(config, name).update(values)
+    asyncio.run(_run_shard(shard_id, items, results, stop))
+
+async def _run_shard(shard_id: int, items: List[Tuple[int, str]], results, stop):
+    # Import qui: il modulo viene caricato anche dal processo principale senza aprire connessioni
+    from scraper import TikTokScraper
+    from http_cache import ResponseCache
+
+    pending = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+
+    async def worker(scraper):
+        # Con stop impostato dal processo principale non si inizia nessun altro video
+        while not stop.is_set():
+            try:
+                rank, url = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            video_data = await scraper.extract_video_data(url)
+            # Ogni risultato parte subito: se il processo cade, quelli già inviati restano
+            if video_data:
+                results.put((RESULT, rank, tuple(video_data[field] for field in FIELDS)))
+            else:
+                results.put((FAILED, rank, None))
+            await asyncio.sleep(config.CONFIG['DELAY'])
+
+    async with TikTokScraper(response_cache=ResponseCache({'ENABLED': False})) as scraper:
+        await asyncio.gather(*[worker(scraper) for _ in range(config.PIPELINE_CONFIG['DETAIL_WORKERS'])])
+    results.put((DONE, shard_id, None))
+
+class ShardedExtractor:
+    """
+    Avvia un processo per shard e restituisce i risultati man mano che arrivano.
+
+    I processi comunicano solo tramite una coda di tuple compatte. Se un
+    processo termina senza segnalare la fine, i risultati già ricevuti
+    vengono mantenuti e i video mancanti vengono segnalati.
+
+    Ogni processo ha un proprio interprete (decine di MB) oltre alla sua
+    parte di MAX_INFLIGHT_BYTES: con BOUNDED_DETAIL su una macchina con poca
+    memoria conviene restare a un solo processo.
+
+    In chiusura (fine, errore o cancellazione) i processi ricevono prima un
+    segnale di stop e finiscono il video in corso; solo quelli ancora attivi
+    dopo SHARD_SHUTDOWN_TIMEOUT vengono terminati. Così nessun processo viene
+    interrotto a metà di una scrittura sulla coda.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.lost: List[int] = []
+
+    async def run(self, items: List[Tuple[int, str]]) -> AsyncIterator[Tuple[int, Optional[Dict]]]:
+        """Genera (posizione, dati del video o None) per ogni video analizzato"""
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        stop = context.Event()
+        shards = [shard for shard in shard_items(items, self.processes) if shard]
+        configs = shard_configs(max(1, len(shards)))
+        workers = [
+            context.Process(target=_shard_main, args=(shard_id, shard, results, stop, configs), daemon=True)
+            for shard_id, shard in enumerate(shards)
+        ]
+        for process in workers:
+            process.start()
+        print(f"Analisi dettagliata su {len(workers)} processi")
+
+        loop = asyncio.get_running_loop()
+        received = set()
+        finished = set()
+        pending_get = None
+        try:
+            while True:
+                # shield: se il generatore viene cancellato la lettura in corso nel
+                # thread non viene abbandonata e il suo messaggio resta recuperabile
+                pending_get = loop.run_in_executor(None, results.get, True, 0.2)
+                try:
+                    message = await asyncio.shield(pending_get)
+                except queue.Empty:
+                    pending_get = None
+                    # Tutti i processi sono terminati (anche in modo anomalo) e la coda è vuota
+                    if all(not process.is_alive() for process in workers):
+                        break
+                    continue
+                pending_get = None
+
+                kind, key, fields = message
+                if kind == DONE:
+                    finished.add(key)
+                    if len(finished) == len(workers):
+                        break
+                    continue
+                received.add(key)
+                yield key, dict(zip(FIELDS, fields)) if kind == RESULT else None
+        finally:
+            if pending_get is not None:
+                # Una sola lettura alla volta dalla coda: prima di svuotarla si attende
+                # quella in corso, altrimenti un DONE letto dal thread andrebbe perso
+                try:
+                    kind, key, _ = await pending_get
+                    if kind == DONE:
+                        finished.add(key)
+                except queue.Empty:
+                    pass
+            # L'attesa dei processi è bloccante: in un thread, per non fermare l'event loop
+            finished.update(await loop.run_in_executor(None, self._shutdown, workers, results, stop))
+            for shard_id, process in enumerate(workers):
+                if shard_id not in finished:
+                    print(f"Processo {shard_id} terminato in modo anomalo (exit code {process.exitcode})")
+            results.close()
+
+        # I risultati arrivati durante la chiusura non vengono più restituiti
+        self.lost = sorted(rank for rank, _ in items if rank not in received)
+        if self.lost:
+            print(f"Video non analizzati per processi interrotti: {len(self.lost)}")
+
+    @staticmethod
+    def _shutdown(workers, results, stop) -> List[int]:
+        """
+        Chiede ai processi di fermarsi e li attende, svuotando la coda perché
+        possano inviare gli ultimi messaggi e uscire. Restituisce gli shard
+        che hanno segnalato la fine durante l'attesa.
+        """
+        stop.set()
+        finished = []
+        deadline = time.monotonic() + config.PIPELINE_CONFIG['SHARD_SHUTDOWN_TIMEOUT']
+        while any(process.is_alive() for process in workers) and time.monotonic() < deadline:
+            try:
+                kind, key, _ = results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if kind == DONE:
+                finished.append(key)
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        return finished
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+FIXTURE_ARCHIVE = os.path.join(ROOT, 'tests', 'fixtures', 'replay.zip')
+
+@pytest.fixture
+def replay_config(monkeypatch, tmp_path):
+    """
+    Configurazione per eseguire lo scraping offline dall'archivio di test:
+    nessun limite di ritmo, nessun download di asset, output in tmp_path
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(config.REPLAY_CONFIG, 'MODE', 'replay')
+    monkeypatch.setitem(config.REPLAY_CONFIG, 'ARCHIVE', FIXTURE_ARCHIVE)
+    monkeypatch.setitem(config.TRANSPORT_CONFIG, 'MAX_REQUESTS_PER_SECOND', None)
+    monkeypatch.setitem(config.ASSETS_CONFIG, 'ENABLED', False)
+    monkeypatch.setitem(config.CONFIG, 'LOCAL_FILENAME', str(tmp_path / 'scriptok.html'))
+    monkeypatch.setitem(config.PIPELINE_CONFIG, 'SHARD_SHUTDOWN_TIMEOUT', 5)
+    return config
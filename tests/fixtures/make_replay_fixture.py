@@ -0,0 +1,107 @@
+"""
+Genera tests/fixtures/replay.zip: archivio di replay piccolo e stabile usato dai test.
+
+Le risposte hanno la stessa forma di quelle registrate da TikTok (lista dei
+trend in JSON, pagine video con lo script di rehydration, compresse gzip)
+ma contenuti sintetici, così l'archivio non contiene dati o credenziali reali.
+
+    python tests/fixtures/make_replay_fixture.py
+"""
+import gzip
+import json
+import os
+import sys
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import API_CONFIG, CONFIG
+from replay import FixtureArchive, request_key
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replay.zip')
+PAGES = 3
+
+AUTH_PARAMS = {'timestamp': '1700000000', 'user-sign': 'fixture-sign', 'web-id': 'fixture-web-id'}
+
+# item_id, titolo, creator, visualizzazioni, categorie, keyword (None = pagina senza JSON di rehydration)
+VIDEOS = [
+    (7300000000000000001, 'Top 10 ricette del 2024', 'Chef Ada', 120500, ['Food'], ['ricette', 'top 10']),
+    (7300000000000000002, 'Caffè al volo #01', 'Barista Bea', 98000, ['Food', 'Lifestyle'], ['caffè']),
+    (7300000000000000003, '100 giorni di corsa', 'Runner Ciro', 450000, ['Sport'], ['corsa', '100 giorni']),
+    (7300000000000000004, 'Tutorial trucco naturale', 'Dani Make Up', 77000, ['Beauty'], []),
+    (7300000000000000005, None, None, None, None, None),
+    (7300000000000000006, 'Gatto contro aspirapolvere', 'Elio Pets', 1300000, ['Animals'], ['gatto']),
+    (7300000000000000007, 'Outfit autunno 2024', 'Fede Style', 56000, ['Fashion'], ['outfit', 'autunno']),
+    (7300000000000000008, 'Allenamento 20 minuti', 'Runner Ciro', 88000, ['Sport'], ['allenamento']),
+    (7300000000000000009, 'Viaggio low cost a Napoli', 'Gio Travel', 210000, ['Travel'], ['napoli']),
+    (7300000000000000010, 'Pasta alla Norma', 'Chef Ada', 64000, ['Food'], ['pasta']),
+    (7300000000000000011, 'Esperimento di chimica', 'Ivo Scienza', 31000, ['Education'], []),
+    (7300000000000000012, 'Balletto virale', 'Lia Dance', 990000, ['Dance'], ['balletto']),
+]
+
+def video_url(item_id: int, creator: str) -> str:
+    handle = (creator or 'utente').lower().replace(' ', '')
+    return f"https://www.tiktok.com/@{handle}/video/{item_id}"
+
+def list_pages():
+    """Tre pagine da 5 video, con duplicati tra pagine come nella lista reale"""
+    ids = [video[0] for video in VIDEOS]
+    pages = [ids[0:5], ids[4:9], ids[8:12] + [ids[0]]]
+    by_id = {video[0]: video for video in VIDEOS}
+    for page, page_ids in enumerate(pages, 1):
+        yield page, [{
+            'item_id': str(item_id),
+            'item_url': video_url(item_id, by_id[item_id][2]),
+            'title': by_id[item_id][1] or '',
+        } for item_id in page_ids]
+
+def video_page(video) -> bytes:
+    item_id, title, creator, views, categories, keywords = video
+    if title is None:
+        return b'<!DOCTYPE html><html><head><title>TikTok</title></head><body>Video non disponibile</body></html>'
+    rehydration = {
+        '__DEFAULT_SCOPE__': {
+            'webapp.video-detail': {
+                'itemInfo': {
+                    'itemStruct': {
+                        'id': str(item_id),
+                        'desc': title,
+                        'author': {'nickname': creator},
+                        'stats': {'playCount': views},
+                        'diversificationLabels': categories,
+                        'suggestedWords': keywords,
+                    }
+                }
+            }
+        }
+    }
+    return (
+        '<!DOCTYPE html><html><head><title>TikTok</title></head><body>'
+        '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        f'{json.dumps(rehydration, ensure_ascii=False)}</script></body></html>'
+    ).encode('utf-8')
+
+def build(path: str = ARCHIVE) -> FixtureArchive:
+    archive = FixtureArchive(path)
+    archive.auth_params = AUTH_PARAMS
+    params = {
+        'period': CONFIG['TIME_PERIOD'],
+        'limit': str(CONFIG['PAGE_SIZE']),
+        'order_by': 'vv',
+        'country_code': CONFIG['COUNTRY_CODE'],
+    }
+    for page, videos in list_pages():
+        request = httpx.Request('GET', API_CONFIG['trend_list_url'], params={**params, 'page': str(page)})
+        body = json.dumps({'code': 0, 'data': {'videos': videos}}).encode('utf-8')
+        archive.add(request_key(request), 200, [('content-type', 'application/json')], body)
+    for video in VIDEOS:
+        request = httpx.Request('GET', video_url(video[0], video[2]))
+        body = gzip.compress(video_page(video), mtime=0)
+        headers = [('content-type', 'text/html; charset=utf-8'), ('content-encoding', 'gzip')]
+        archive.add(request_key(request), 200, headers, body)
+    archive.save()
+    return archive
+
+if __name__ == "__main__":
+    archive = build()
+    print(f"Archivio generato: {archive.path} ({len(archive.entries)} risposte)")
@@ -0,0 +1,122 @@
+import os
+import pytest
+import assets
+from assets import AssetBuilder, content_hash, minify_css, minify_js
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FONT_CSS = """/* latin */
+@font-face {
+  font-family: 'Inter';
+  font-weight: 400;
+  src: url(https://fonts.gstatic.com/s/inter/latin-400.woff2) format('woff2');
+}
+/* latin-ext */
+@font-face {
+  font-family: 'Inter';
+  font-weight: 400;
+  src: url(https://fonts.gstatic.com/s/inter/latin-ext-400.woff2) format('woff2');
+}
+/* cyrillic */
+@font-face {
+  font-family: 'Inter';
+  font-weight: 400;
+  src: url(https://fonts.gstatic.com/s/inter/cyrillic-400.woff2) format('woff2');
+}
+"""
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    """AssetBuilder con VENDOR_DIR già popolata: nessun download durante i test"""
+    def no_network(*args, **kwargs):
+        raise AssertionError('download non previsto')
+    monkeypatch.setattr(assets.httpx, 'get', no_network)
+
+    vendor = tmp_path / 'vendor'
+    vendor.mkdir()
+    (vendor / 'inter.css').write_text(FONT_CSS, encoding='utf-8')
+    for subset in ('latin', 'latin-ext'):
+        url = f"https://fonts.gstatic.com/s/inter/{subset}-400.woff2"
+        (vendor / f"inter-{content_hash(url.encode())}.woff2").write_bytes(subset.encode())
+    for name, version in assets.ASSETS_CONFIG['D3_MODULES']:
+        (vendor / f"{name}-{version}.min.js").write_text(f"// {name}\nvar {name.replace('-', '_')} = 1;\n")
+
+    output = tmp_path / 'site'
+    output.mkdir()
+    return AssetBuilder(str(output), {
+        'VENDOR_DIR': str(vendor),
+        'TREND_SOURCE': os.path.join(ROOT, 'trend.html'),
+        'TREND_DATA_SOURCE': os.path.join(ROOT, 'trend_data.js'),
+    })
+
+def test_minify_css_fallback(monkeypatch):
+    monkeypatch.setattr(assets, 'rcssmin', None)
+    css = "/* titolo */\nh1 > span ,\n.card {\n  color: red;\n  margin: 0 auto;\n}\na :hover { top: 0 }\n"
+
+    # Lo spazio prima di ':' resta: 'a :hover' non equivale a 'a:hover'
+    assert minify_css(css) == 'h1>span,.card{color:red;margin:0 auto}a :hover{top:0}'
+
+def test_minify_js_fallback_keeps_line_breaks(monkeypatch):
+    monkeypatch.setattr(assets, 'rjsmin', None)
+    js = "// commento\nconst a = 1\n\n    const url = 'http://x' // resta\nlet b = a\n"
+
+    # Gli a capo restano: senza punti e virgola il codice dipende dall'ASI
+    assert minify_js(js) == "const a = 1\nconst url = 'http://x' // resta\nlet b = a"
+
+def test_emit_replaces_only_previous_versions(builder):
+    first = builder.emit('scriptok', '.css', 'a{}')
+    os.makedirs(builder.assets_dir, exist_ok=True)
+    for extra in ('scriptok.css.map', 'scriptok-extra.0123456789.css', 'other.0123456789.css'):
+        open(os.path.join(builder.assets_dir, extra), 'w').close()
+    stale = os.path.join(builder.assets_dir, os.path.basename(first) + '.gz')
+    open(stale, 'w').close()
+
+    second = builder.emit('scriptok', '.css', 'b{}')
+
+    assert first != second
+    assert second == f"assets/scriptok.{content_hash(b'b{}')}.css"
+    assert sorted(os.listdir(builder.assets_dir)) == sorted([
+        os.path.basename(second), 'scriptok.css.map', 'scriptok-extra.0123456789.css', 'other.0123456789.css'])
+    # Lo stesso contenuto mantiene lo stesso nome
+    assert builder.emit('scriptok', '.css', 'b{}') == second
+
+def test_relative_to_css():
+    css = "src: url(assets/inter-latin-400.abc.woff2); background: url(images/x.png)"
+
+    assert AssetBuilder._relative_to_css(css, 'assets') == \
+        "src: url(inter-latin-400.abc.woff2); background: url(images/x.png)"
+
+def test_fonts_use_only_configured_subsets(builder):
+    font_face_css, preloads = builder.fonts()
+
+    assert 'fonts.gstatic.com' not in font_face_css
+    assert 'cyrillic' not in font_face_css
+    assert preloads == [f"assets/inter-latin-400.{content_hash(b'latin')}.woff2"]
+    assert f"url(assets/inter-latin-ext-400.{content_hash(b'latin-ext')}.woff2)" in font_face_css
+
+def test_build_trend_page_rewrites_remote_tags(builder):
+    output = builder.build_trend_page()
+
+    with open(output, encoding='utf-8') as f:
+        html = f.read()
+    assert output == os.path.join(builder.output_dir, 'trend.min.html')
+    assert 'fonts.googleapis.com' not in html
+    assert 'cdnjs.cloudflare.com' not in html
+    assert 'src="trend_data.js"' not in html
+
+    d3_files = [name for name in os.listdir(builder.assets_dir) if name.startswith('d3.')]
+    data_files = [name for name in os.listdir(builder.assets_dir) if name.startswith('trend_data.')]
+    assert len(d3_files) == len(data_files) == 1
+    assert f'<script defer src="assets/{d3_files[0]}"></script>' in html
+    assert f'<link rel="preload" href="assets/{d3_files[0]}" as="script">' in html
+    assert f'<script defer src="assets/{data_files[0]}"></script>' in html
+    assert 'as="font" type="font/woff2" crossorigin>' in html
+    assert html.index('as="font"') > html.index('</title>')
+    with open(os.path.join(builder.assets_dir, d3_files[0]), encoding='utf-8') as f:
+        bundle = f.read()
+    assert bundle.index('var d3_array') < bundle.index('var d3_transition')
+
+def test_build_trend_page_without_source(builder):
+    builder.config['TREND_SOURCE'] = os.path.join(builder.output_dir, 'assente.html')
+
+    assert builder.build_trend_page() is None
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import httpx
+from http_cache import ResponseCache
+from pipeline import ScrapingPipeline
+from scraper import TikTokScraper
+from transport import HTTPTransport
+
+URL = 'https://ads.tiktok.com/creative_radar_api/v1/popular_trend/list'
+VIDEOS = [{'item_id': '1', 'item_url': 'https://www.tiktok.com/@a/video/1'}]
+
+def make_cache(tmp_path, enabled=True):
+    return ResponseCache({'ENABLED': enabled, 'PATH': str(tmp_path / 'cache.json')})
+
+def test_key_ignores_parameter_order():
+    assert ResponseCache.make_key(URL, {'page': '1', 'limit': '20'}) == \
+        ResponseCache.make_key(URL, {'limit': '20', 'page': '1'})
+
+def test_conditional_headers_and_not_modified(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key(URL, {'page': '1'})
+    assert cache.conditional_headers(key) == {}
+
+    cache.store(key, b'{"data": 1}', {'etag': '"abc"', 'last-modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}, VIDEOS)
+
+    assert cache.conditional_headers(key) == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+    assert cache.not_modified(key) == VIDEOS
+    assert cache.hits == 1
+
+def test_body_hash_lookup(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key(URL, {'page': '1'})
+    cache.store(key, b'body', {}, VIDEOS)
+
+    assert cache.lookup_body(key, b'body') == VIDEOS
+    assert cache.lookup_body(key, b'altro body') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_save_and_reload(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key(URL, {'page': '2'})
+    cache.store(key, b'body', {'etag': '"v1"'}, VIDEOS)
+    cache.save()
+
+    reloaded = make_cache(tmp_path)
+    assert reloaded.lookup_body(key, b'body') == VIDEOS
+    assert reloaded.conditional_headers(key) == {'If-None-Match': '"v1"'}
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, enabled=False)
+    key = cache.make_key(URL, {'page': '1'})
+    cache.store(key, b'body', {'etag': '"v1"'}, VIDEOS)
+    cache.save()
+
+    assert cache.conditional_headers(key) == {}
+    assert cache.lookup_body(key, b'body') is None
+    assert not (tmp_path / 'cache.json').exists()
+
+def test_details_are_reused_only_for_unchanged_pages(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key(URL, {'page': '1'})
+    cache.store(key, b'body', {}, VIDEOS)
+    cache.store_details('1', {'titolo': 'Video 1'})
+    # Pagina appena scaricata (cambiata): i dettagli non vengono riusati
+    assert cache.cached_details('1') is None
+    cache.save()
+
+    unchanged = make_cache(tmp_path)
+    unchanged.lookup_body(key, b'body')
+    assert unchanged.cached_details('1') == {'titolo': 'Video 1'}
+    assert unchanged.detail_hits == 1
+
+    changed = make_cache(tmp_path)
+    changed.lookup_body(key, b'nuovo body')
+    changed.store(key, b'nuovo body', {}, VIDEOS)
+    assert changed.cached_details('1') is None
+    assert 'details' not in changed.entries[key]
+
+def list_body(ids):
+    videos = [{'item_id': str(i), 'item_url': f"https://www.tiktok.com/@a/video/{i}"} for i in ids]
+    return json.dumps({'data': {'videos': videos}})
+
+def video_body(item_id):
+    data = {'__DEFAULT_SCOPE__': {'webapp.video-detail': {'itemInfo': {'itemStruct': {'desc': f"Video {item_id}"}}}}}
+    return (f'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__">{json.dumps(data)}</script>')
+
+def test_unchanged_pages_skip_detail_requests(tmp_path):
+    pages = {'1': list_body([1, 2]), '2': list_body([3])}
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith('/list'):
+            return httpx.Response(200, text=pages[request.url.params['page']])
+        return httpx.Response(200, text=video_body(request.url.path.split('/')[-1]))
+
+    def run():
+        async def scrape():
+            transport = HTTPTransport({'MAX_REQUESTS_PER_SECOND': None}, transport=httpx.MockTransport(handler))
+            async with TikTokScraper(transport=transport, response_cache=make_cache(tmp_path)) as scraper:
+                pipeline = ScrapingPipeline(scraper, {}, {}, pages=2, output_videos=3)
+                videos, _ = await pipeline.run()
+                return [video['titolo'] for video in videos]
+        requests.clear()
+        return asyncio.run(scrape())
+
+    assert run() == ['Video 3', 'Video 2', 'Video 1']
+    assert len([path for path in requests if '/video/' in path]) == 3
+
+    # Stesse pagine: nessuna pagina video riscaricata
+    assert run() == ['Video 3', 'Video 2', 'Video 1']
+    assert [path for path in requests if '/video/' in path] == []
+
+    # Cambia solo la pagina 2: si rianalizzano solo i suoi video
+    pages['2'] = list_body([3, 4])
+    assert run() == ['Video 4', 'Video 3', 'Video 2']
+    assert sorted(path for path in requests if '/video/' in path) == ['/@a/video/3', '/@a/video/4']
@@ -0,0 +1,47 @@
+import asyncio
+from memory_budget import ByteBudget
+
+def test_acquire_waits_for_room():
+    async def run():
+        budget = ByteBudget(10)
+        peak = 0
+
+        async def download(size):
+            nonlocal peak
+            await budget.acquire(size)
+            peak = max(peak, budget.used)
+            await asyncio.sleep(0.01)
+            await budget.release(size)
+
+        await asyncio.gather(*[download(4) for _ in range(8)])
+        return peak, budget.used
+
+    assert asyncio.run(run()) == (8, 0)
+
+def test_oversized_request_passes_alone():
+    async def run():
+        budget = ByteBudget(10)
+        await budget.acquire(50)
+        used = budget.used
+        await budget.release(50)
+        return used, budget.used
+
+    assert asyncio.run(run()) == (50, 0)
+
+def test_resize_shrinks_immediately_and_waits_to_grow():
+    async def run():
+        budget = ByteBudget(10)
+        await budget.acquire(6)
+        await budget.acquire(4)
+        await budget.resize(6, 2)
+        assert budget.used == 6
+
+        grow = asyncio.ensure_future(budget.resize(2, 8))
+        await asyncio.sleep(0.01)
+        # 4 + 8 supererebbe il limite: la crescita attende il rilascio
+        assert not grow.done()
+        await budget.release(4)
+        await grow
+        return budget.used
+
+    assert asyncio.run(run()) == 8
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+from http_cache import ResponseCache
+from pipeline import PartialResults, ScrapingPipeline, partial_filename
+from scraper import TikTokScraper
+
+class FakeScraper:
+    """Tre pagine con un duplicato; i dettagli registrano cosa è già nel file parziale"""
+
+    unavailable_video = staticmethod(TikTokScraper.unavailable_video)
+
+    def __init__(self, partial_path=None):
+        self.partial_path = partial_path
+        self.seen_on_disk = []
+        self.response_cache = ResponseCache({'ENABLED': False})
+
+    async def fetch_tiktok_page(self, page, params, headers):
+        ids = {1: [1, 2, 3], 2: [3, 4, 5], 3: [6]}[page]
+        return [{'item_id': str(i), 'item_url': f"https://www.tiktok.com/@a/video/{i}"} for i in ids]
+
+    async def extract_video_data(self, url):
+        if self.partial_path:
+            with open(self.partial_path, encoding='utf-8') as f:
+                self.seen_on_disk.append(len(f.readlines()))
+        if url.endswith('/4'):
+            return None
+        return {'titolo': url.split('/')[-1], 'url': url}
+
+def make_pipeline(scraper, **kwargs):
+    config = {'LIST_WORKERS': 2, 'DETAIL_WORKERS': 1, 'QUEUE_SIZE': 2, 'DETAIL_PROCESSES': 1}
+    return ScrapingPipeline(scraper, {}, {}, pages=3, output_videos=4, config=config, **kwargs)
+
+def test_pipeline_keeps_latest_unique_videos_in_order():
+    pipeline = make_pipeline(FakeScraper())
+    videos, total = asyncio.run(pipeline.run())
+
+    assert total == 6
+    assert pipeline.selected_videos == 4
+    # Il video 4 non è analizzabile e manca dal risultato
+    assert [video['titolo'] for video in videos] == ['6', '5', '3']
+
+def test_results_reach_the_sink_while_the_pipeline_runs(tmp_path):
+    path = partial_filename(str(tmp_path / 'scriptok.html'))
+    scraper = FakeScraper(path)
+    sink = PartialResults(path)
+    asyncio.run(make_pipeline(scraper, on_result=sink).run())
+    sink.close()
+
+    # Con un solo detail worker, ogni video trova su disco i risultati precedenti
+    assert scraper.seen_on_disk == [0, 1, 2, 2]
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line['rank'], line['titolo']) for line in lines] == [(1, '6'), (2, '5'), (4, '3')]
+
+    sink.discard()
+    assert not (tmp_path / 'scriptok.partial.jsonl').exists()
+
+def test_stage_failure_cancels_the_pipeline():
+    class FailingScraper(FakeScraper):
+        async def extract_video_data(self, url):
+            raise RuntimeError('errore nello stadio dei dettagli')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(make_pipeline(FailingScraper()).run())
@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import pytest
+from preview_server import PreviewServer, choose_encoding, precompress
+
+CONTENT = b'<!DOCTYPE html><html><body>' + b'anteprima ' * 200 + b'</body></html>'
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'scriptok.html').write_bytes(CONTENT)
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'assets' / 'scriptok.0123456789.js').write_text('console.log(1)')
+    (tmp_path / 'run.py').write_text("FTP_PASSWORD = 'segreta'")
+    (tmp_path / '.http_cache.json').write_text('{}')
+    precompress(str(tmp_path), ('.html', '.js', '.json'))
+    return PreviewServer({'ROOT': str(tmp_path)})
+
+@pytest.mark.parametrize('value, expected', [
+    ('bytes=0-9', (0, 9)),
+    ('bytes=10-', (10, 99)),
+    ('bytes=-20', (80, 99)),
+    ('bytes=90-500', (90, 99)),
+    ('bytes=100-', None),
+    ('bytes=5-2', None),
+    ('bytes=-0', None),
+    ('bytes=-', None),
+    ('items=0-1', None),
+])
+def test_parse_range(value, expected):
+    assert PreviewServer._parse_range(value, 100) == expected
+
+def test_only_generated_files_are_served(server, tmp_path):
+    assert server.build_response('GET', '/', {})[0] == 200
+    assert server.build_response('GET', '/run.py', {})[0] == 404
+    assert server.build_response('GET', '/.http_cache.json', {})[0] == 404
+    assert server.build_response('GET', '/scriptok.html.gz', {})[0] == 404
+    assert server.build_response('GET', '/../run.py', {})[0] == 404
+    assert not (tmp_path / '.http_cache.json.gz').exists()
+
+def test_encoding_variants_have_distinct_etags(server):
+    status, identity_headers, body = server.build_response('GET', '/scriptok.html', {})
+    assert status == 200 and body == CONTENT
+    assert 'Content-Encoding' not in identity_headers
+
+    status, gzip_headers, body = server.build_response('GET', '/scriptok.html', {'accept-encoding': 'gzip'})
+    assert gzip_headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == CONTENT
+    assert gzip_headers['ETag'] != identity_headers['ETag']
+    assert gzip_headers['Vary'] == 'Accept-Encoding'
+
+def test_conditional_request_matches_the_representation(server):
+    _, headers, _ = server.build_response('GET', '/scriptok.html', {'accept-encoding': 'gzip'})
+
+    assert server.build_response('GET', '/scriptok.html', {
+        'accept-encoding': 'gzip', 'if-none-match': headers['ETag']})[0] == 304
+    # Lo stesso ETag non vale per la rappresentazione non compressa
+    assert server.build_response('GET', '/scriptok.html', {'if-none-match': headers['ETag']})[0] == 200
+
+def test_range_uses_uncompressed_content(server):
+    status, headers, body = server.build_response('GET', '/scriptok.html', {
+        'range': 'bytes=0-14', 'accept-encoding': 'gzip'})
+
+    assert status == 206
+    assert body == CONTENT[:15]
+    assert headers['Content-Range'] == f"bytes 0-14/{len(CONTENT)}"
+    assert 'Content-Encoding' not in headers
+
+    status, headers, _ = server.build_response('GET', '/scriptok.html', {'range': f'bytes={len(CONTENT)}-'})
+    assert status == 416
+    assert headers['Content-Range'] == f"bytes */{len(CONTENT)}"
+
+def test_cache_control_and_method(server):
+    _, headers, _ = server.build_response('GET', '/assets/scriptok.0123456789.js', {})
+    assert headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert server.build_response('GET', '/', {})[1]['Cache-Control'] == 'no-cache'
+    assert server.build_response('POST', '/', {})[0] == 405
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('br;q=0.5, gzip;q=0.8', 'gzip'),
+    ('*', 'br'),
+    ('*;q=0.3, br;q=0', 'gzip'),
+    ('*;q=0', None),
+    ('gzip;q=0.5, identity', None),
+    ('identity', None),
+    ('', None),
+    ('br;q=abc, gzip;q=0', None),
+])
+def test_choose_encoding_respects_q_values(accept_encoding, expected):
+    assert choose_encoding(accept_encoding, {'br': b'', 'gzip': b''}) == expected
+
+def test_refused_encoding_is_never_sent(server):
+    _, headers, body = server.build_response('GET', '/scriptok.html', {'accept-encoding': 'br;q=0, gzip'})
+    assert headers.get('Content-Encoding') == 'gzip'
+    assert gzip.decompress(body) == CONTENT
+
+def test_not_modified_has_no_content_length(server):
+    async def exchange(etag):
+        result = {}
+
+        async def handle(reader, writer):
+            await server.handle_connection(reader, writer)
+
+        listener = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"GET /scriptok.html HTTP/1.1\r\nIf-None-Match: {etag}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        result['response'] = await reader.read()
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return result['response']
+
+    etag = server.build_response('GET', '/scriptok.html', {})[1]['ETag']
+    response = asyncio.run(exchange(etag)).decode('latin-1')
+
+    assert response.startswith('HTTP/1.1 304 Not Modified')
+    assert f"ETag: {etag}" in response
+    assert 'Content-Length' not in response
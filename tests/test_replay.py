@@ -0,0 +1,112 @@
+import asyncio
+import os
+import pytest
+
+import main
+from config import CONFIG
+from pipeline import ScrapingPipeline
+from replay import FixtureArchive, RecordingTransport, ReplayTransport
+from scraper import TikTokScraper
+from transport import HTTPTransport
+from search_index import SearchIndex, index_filename
+
+PAGES = 3
+# Id dei video nell'archivio di test, dal più recente
+LATEST_IDS = [f"73000000000000000{n:02d}" for n in range(12, 0, -1)]
+
+def run_pipeline(output_videos: int, transport=None):
+    async def run():
+        async with TikTokScraper(transport=transport) as scraper:
+            auth = await scraper.extract_auth_params()
+            headers = {'timestamp': auth['timestamp'], 'user-sign': auth['user-sign'],
+                       'anonymous-user-id': auth['web-id']}
+            params = {'period': CONFIG['TIME_PERIOD'], 'limit': str(CONFIG['PAGE_SIZE']),
+                      'order_by': 'vv', 'country_code': CONFIG['COUNTRY_CODE']}
+            pipeline = ScrapingPipeline(scraper, params, headers, PAGES, output_videos)
+            videos, total = await pipeline.run()
+            return videos, total, pipeline, scraper.transport
+    return asyncio.run(run())
+
+def video_ids(videos):
+    return [video['url'].split('/')[-1] for video in videos]
+
+def test_run_scraping_writes_page_and_index(replay_config):
+    asyncio.run(main.main(pages=PAGES, num_videos=8))
+
+    output = replay_config.CONFIG['LOCAL_FILENAME']
+    assert os.path.exists(output)
+    index = SearchIndex.load(index_filename(output))
+    assert index.ids == LATEST_IDS[:8]
+    assert index.search_ids('2024') == ['7300000000000000007']
+    assert index.search_ids('corsa', creator='Runner Ciro') == []
+    with open(output, encoding='utf-8') as f:
+        assert 'Balletto virale' in f.read()
+
+def test_pipeline_selects_latest_unique_videos(replay_config):
+    videos, total, pipeline, _ = run_pipeline(8)
+
+    assert total == 12
+    assert video_ids(videos) == LATEST_IDS[:8]
+    assert videos[0]['titolo'] == 'Balletto virale'
+    assert videos[0]['views'] == '990.000'
+    assert videos[0]['categorie'] == 'Dance'
+    # Pagina senza JSON di rehydration
+    assert videos[7]['titolo'] == 'Video non disponibile'
+    assert set(pipeline.stage_stats) == {'list', 'top_k', 'detail', 'sink'}
+    assert pipeline.stage_stats['list']['items'] == PAGES
+
+@pytest.mark.parametrize('overrides', [
+    {'MEMORY_CONFIG': {'BOUNDED_DETAIL': True, 'MAX_INFLIGHT_BYTES': 64 * 1024, 'MAX_PAGE_BYTES': 16 * 1024}},
+    {'PIPELINE_CONFIG': {'DETAIL_PROCESSES': 2}},
+    {'PIPELINE_CONFIG': {'DETAIL_PROCESSES': 2}, 'MEMORY_CONFIG': {'BOUNDED_DETAIL': True}},
+], ids=['bounded', 'sharded', 'sharded-bounded'])
+@pytest.mark.parametrize('error_rate', [0.0, 0.3], ids=['no-errors', 'errors'])
+def test_detail_modes_match_default(replay_config, monkeypatch, overrides, error_rate):
+    # Con errori simulati un video che riceve un errore HTTP va scartato in ogni modalità
+    monkeypatch.setitem(replay_config.REPLAY_CONFIG, 'ERROR_RATE', error_rate)
+    expected, expected_total, _, _ = run_pipeline(8)
+    for name, values in overrides.items():
+        for key, value in values.items():
+            monkeypatch.setitem(getattr(replay_config, name), key, value)
+
+    videos, total, _, _ = run_pipeline(8)
+
+    assert total == expected_total
+    assert videos == expected
+    if error_rate:
+        # L'iniezione deve colpire davvero almeno una pagina di dettaglio
+        assert len(expected) < 8
+
+def test_replay_errors_are_deterministic(replay_config, monkeypatch):
+    expected, _, _, _ = run_pipeline(8)
+    monkeypatch.setitem(replay_config.REPLAY_CONFIG, 'ERROR_RATE', 0.3)
+    monkeypatch.setitem(replay_config.REPLAY_CONFIG, 'CONNECTION_ERROR_RATE', 0.1)
+
+    first = run_pipeline(8)[:2]
+    second = run_pipeline(8)[:2]
+
+    assert first == second
+    assert first[0] != expected
+
+def test_missing_recording_is_reported(replay_config, monkeypatch):
+    monkeypatch.setitem(replay_config.CONFIG, 'COUNTRY_CODE', 'FR')
+    videos, total, _, transport = run_pipeline(8)
+
+    assert (videos, total) == ([], 0)
+    assert transport._transport.missing == PAGES
+
+def test_recorded_archive_replays_the_same_run(replay_config, monkeypatch, tmp_path):
+    source = FixtureArchive(replay_config.REPLAY_CONFIG['ARCHIVE']).load()
+    recorded = FixtureArchive(str(tmp_path / 'recorded.zip'))
+    recorded.auth_params = source.auth_params
+    recording = RecordingTransport(ReplayTransport(source), recorded)
+    expected, _, _, _ = run_pipeline(8, transport=HTTPTransport(transport=recording))
+    recorded.save()
+
+    monkeypatch.setitem(replay_config.REPLAY_CONFIG, 'ARCHIVE', recorded.path)
+    videos, total, _, _ = run_pipeline(8)
+
+    assert total == 12
+    assert videos == expected
+    # Solo le richieste fatte: le pagine della lista e gli 8 video analizzati
+    assert len(recorded.entries) == PAGES + 8
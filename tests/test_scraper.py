@@ -0,0 +1,42 @@
+import asyncio
+import json
+import httpx
+import pytest
+import config
+from scraper import TikTokScraper
+from transport import HTTPTransport
+
+def video_page(title):
+    data = {'__DEFAULT_SCOPE__': {'webapp.video-detail': {'itemInfo': {'itemStruct': {
+        'desc': title, 'author': {'nickname': 'Ada'}, 'stats': {'playCount': 1500},
+        'diversificationLabels': ['Food'], 'suggestedWords': []}}}}}
+    return f'<html><script id="__UNIVERSAL_DATA_FOR_REHYDRATION__">{json.dumps(data)}</script></html>'
+
+def handler(request):
+    path = request.url.path
+    if path == '/ok':
+        return httpx.Response(200, text=video_page('Ricetta'))
+    if path == '/no-json':
+        return httpx.Response(200, text='<html><body>Video non disponibile</body></html>')
+    if path == '/rate-limited':
+        return httpx.Response(429)
+    return httpx.Response(503)
+
+@pytest.mark.parametrize('bounded', [False, True], ids=['default', 'bounded'])
+def test_detail_modes_treat_pages_alike(monkeypatch, bounded):
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'BOUNDED_DETAIL', bounded)
+
+    async def run():
+        transport = HTTPTransport({'MAX_REQUESTS_PER_SECOND': None}, transport=httpx.MockTransport(handler))
+        async with TikTokScraper(transport=transport) as scraper:
+            return [await scraper.extract_video_data(f"https://www.tiktok.com{path}")
+                    for path in ('/ok', '/no-json', '/rate-limited', '/error')]
+
+    ok, no_json, rate_limited, error = asyncio.run(run())
+
+    assert ok['titolo'] == 'Ricetta'
+    assert ok['views'] == '1.500'
+    # Pagina valida senza JSON: segnaposto; errore HTTP: video scartato
+    assert no_json == TikTokScraper.unavailable_video('https://www.tiktok.com/no-json')
+    assert rate_limited is None
+    assert error is None
@@ -0,0 +1,51 @@
+from search_index import SearchIndex, build_index, decode_postings, encode_postings, normalize, tokenize
+
+def make_video(doc_id, title, creator='N/A', categories=(), keywords=()):
+    return {'id': str(doc_id), 'title': title, 'creator': creator,
+            'categories': list(categories), 'keywords': list(keywords)}
+
+VIDEOS = [
+    make_video(0, 'Top 10 ricette del 2024', 'Chef Ada', ['Food'], ['ricette']),
+    make_video(1, '100 giorni di corsa #01', 'Runner Ciro', ['Sport']),
+    make_video(2, 'Caffè naïve 20 minuti', 'Barista Bea', ['Food', 'Lifestyle']),
+    make_video(3, 'Outfit 2024', 'N/A', [], ['outfit']),
+]
+
+def test_postings_roundtrip():
+    assert encode_postings([7, 2, 2, 40]) == [2, 5, 33]
+    assert decode_postings(encode_postings([7, 2, 2, 40])) == [2, 7, 40]
+
+def test_normalize_strips_all_marks():
+    assert normalize('Caffè NAÏVE') == 'caffe naive'
+    # Segno combinante con classe 0 (U+0E31), tolto come fa /\p{M}/u in JavaScript
+    assert normalize('สั') == 'ส'
+    assert tokenize('a 10 è #01') == ['10', '01']
+
+def test_vocabulary_is_sorted_array_with_parallel_postings():
+    index = build_index(VIDEOS)
+
+    assert index['vocabulary'] == sorted(index['vocabulary'])
+    assert len(index['postings']) == len(index['vocabulary'])
+    assert '2024' in index['vocabulary']
+    assert 'text' not in index
+
+def test_numeric_tokens_are_found():
+    index = SearchIndex(build_index(VIDEOS))
+
+    assert index.search('2024') == [0, 3]
+    assert index.search('100') == [1]
+    assert index.search('10') == [0, 1]
+    assert index.search('01') == [1]
+    assert index.search('20') == [0, 2, 3]
+
+def test_prefix_accent_and_facet_search():
+    index = SearchIndex(build_index(VIDEOS))
+
+    assert index.search('caffe') == [2]
+    assert index.search('ricet 2024') == [0]
+    assert index.search(category='Food') == [0, 2]
+    assert index.search('20', category='Food') == [0, 2]
+    assert index.search(creator='Nessuno') == []
+    assert index.search_ids('outfit') == ['3']
+    assert index.search() == [0, 1, 2, 3]
+    assert index.facet_values('categories') == {'Food': 2, 'Lifestyle': 1, 'Sport': 1}
@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+import config
+from conftest import FIXTURE_ARCHIVE
+from replay import FixtureArchive
+from sharding import ShardedExtractor, shard_configs, shard_items
+
+def video_items():
+    archive = FixtureArchive(FIXTURE_ARCHIVE).load()
+    urls = sorted(key.split(' ', 1)[1] for key in archive.entries if '/video/' in key)
+    return list(enumerate(urls, start=1))
+
+def test_shard_items_round_robin():
+    items = [(rank, f"url{rank}") for rank in range(1, 6)]
+
+    assert shard_items(items, 2) == [[(1, 'url1'), (3, 'url3'), (5, 'url5')], [(2, 'url2'), (4, 'url4')]]
+
+def test_shard_configs_split_global_limits(monkeypatch):
+    monkeypatch.setitem(config.MEMORY_CONFIG, 'MAX_INFLIGHT_BYTES', 9 * 1024 * 1024)
+    monkeypatch.setitem(config.TRANSPORT_CONFIG, 'MAX_REQUESTS_PER_SECOND', 3)
+
+    configs = shard_configs(3)
+
+    assert configs['MEMORY_CONFIG']['MAX_INFLIGHT_BYTES'] == 3 * 1024 * 1024
+    assert configs['TRANSPORT_CONFIG']['MAX_REQUESTS_PER_SECOND'] == 1
+    # La configurazione del processo principale non cambia
+    assert config.MEMORY_CONFIG['MAX_INFLIGHT_BYTES'] == 9 * 1024 * 1024
+
+def test_all_shards_report_done(replay_config, capsys):
+    items = video_items()
+
+    async def run():
+        return [result async for result in ShardedExtractor(2).run(items)]
+
+    results = asyncio.run(run())
+
+    assert sorted(rank for rank, _ in results) == [rank for rank, _ in items]
+    assert 'anomalo' not in capsys.readouterr().out
+
+@pytest.mark.parametrize('cancel', [False, True], ids=['aclose', 'cancel'])
+def test_early_stop_keeps_the_event_loop_running(replay_config, monkeypatch, capsys, cancel):
+    # Un video alla volta per processo, con latenza: i processi hanno ancora lavoro all'arresto
+    monkeypatch.setitem(replay_config.REPLAY_CONFIG, 'LATENCY', 0.3)
+    monkeypatch.setitem(replay_config.PIPELINE_CONFIG, 'DETAIL_WORKERS', 1)
+    items = video_items()
+
+    async def run():
+        ticks = []
+        first = asyncio.Event()
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def consume():
+            results = ShardedExtractor(2).run(items)
+            try:
+                async for _ in results:
+                    first.set()
+                    if not cancel:
+                        break
+            finally:
+                await results.aclose()
+
+        ticking = asyncio.ensure_future(ticker())
+        consuming = asyncio.ensure_future(consume())
+        await first.wait()
+        started = time.monotonic()
+        if cancel:
+            # Cancellato mentre attende il risultato successivo, con una lettura in corso nel thread
+            consuming.cancel()
+        await asyncio.gather(consuming, return_exceptions=True)
+        stopped = time.monotonic()
+        ticking.cancel()
+        return [tick for tick in ticks if started <= tick <= stopped], stopped - started
+
+    ticks_during_shutdown, shutdown_time = asyncio.run(run())
+
+    assert shutdown_time < replay_config.PIPELINE_CONFIG['SHARD_SHUTDOWN_TIMEOUT']
+    # L'event loop continua a girare mentre si attendono i processi
+    assert len(ticks_during_shutdown) >= 5
+    # Ogni processo ha segnalato la fine: nessun DONE perso, nessun processo terminato a forza
+    assert 'anomalo' not in capsys.readouterr().out
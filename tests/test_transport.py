@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+import pytest
+from transport import HTTPTransport, RateLimiter
+
+def local_server(requests):
+    """Server di prova: registra le richieste e risponde con il path richiesto"""
+    def handler(request):
+        requests.append(request)
+        if request.url.path == '/big':
+            return httpx.Response(200, content=b'x' * 5000)
+        if request.url.path == '/missing':
+            return httpx.Response(404)
+        return httpx.Response(200, text=request.url.path)
+    return httpx.MockTransport(handler)
+
+def test_base_url_rewrites_scheme_and_host():
+    transport = HTTPTransport(base_url='http://127.0.0.1:8080/prefix')
+
+    assert transport.resolve_url('https://www.tiktok.com/@a/video/1?lang=it#top') == \
+        'http://127.0.0.1:8080/prefix/@a/video/1?lang=it#top'
+    assert HTTPTransport(base_url='').resolve_url('https://www.tiktok.com/x') == 'https://www.tiktok.com/x'
+
+def test_requests_go_to_the_stand_in_server_on_one_client():
+    requests = []
+
+    async def run():
+        async with HTTPTransport(base_url='http://stand-in', transport=local_server(requests)) as transport:
+            first = await transport.get('https://ads.tiktok.com/list', params={'page': '1'})
+            client = transport.client
+            second = await transport.get('https://www.tiktok.com/@a/video/1')
+            assert transport.client is client
+            return first.text, second.text, transport
+
+    first, second, transport = asyncio.run(run())
+
+    assert (first, second) == ('/list', '/@a/video/1')
+    assert [str(r.url) for r in requests] == ['http://stand-in/list?page=1', 'http://stand-in/@a/video/1']
+    # Chiuso all'uscita dal context manager
+    assert transport._client is None
+
+def test_read_limited_enforces_the_byte_cap():
+    async def run():
+        async with HTTPTransport(transport=local_server([])) as transport:
+            assert await transport.read_limited('http://x/big', 5000) == b'x' * 5000
+            with pytest.raises(ValueError):
+                await transport.read_limited('http://x/big', 4999)
+            with pytest.raises(httpx.HTTPStatusError):
+                await transport.read_limited('http://x/missing', 5000)
+
+    asyncio.run(run())
+
+def test_rate_limiter_spaces_requests_across_workers():
+    requests = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        async with HTTPTransport({'MAX_REQUESTS_PER_SECOND': 20}, transport=local_server(requests)) as transport:
+            started = []
+
+            async def worker():
+                await transport.rate_limiter.wait()
+                started.append(loop.time())
+
+            await asyncio.gather(*[worker() for _ in range(5)])
+            await asyncio.gather(*[transport.get('http://x/') for _ in range(3)])
+            return started
+
+    started = asyncio.run(run())
+
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+    assert len(requests) == 3
+
+def test_rate_limiter_disabled():
+    async def run():
+        limiter = RateLimiter(None)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(100):
+            await limiter.wait()
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 0.05
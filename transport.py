@@ -0,0 +1,138 @@
+"""
+Trasporto HTTP asincrono condiviso tra lo scraping delle liste e dei dettagli video
+"""
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+import asyncio
+import importlib.util
+import httpx
+from config import TRANSPORT_CONFIG
+
+class RateLimiter:
+    """
+    Distanzia l'inizio delle richieste di almeno 1/rate secondi, qualunque
+    sia il numero di worker che le fanno. Con rate None non limita nulla.
+    """
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class HTTPTransport:
+    """
+    Client HTTP unico con pool di connessioni keep-alive.
+
+    Tutte le richieste passano dallo stesso httpx.AsyncClient, quindi le
+    connessioni (e con esse risoluzione DNS e handshake TLS) vengono
+    riutilizzate. Con HTTP/2 attivo più richieste verso lo stesso host
+    condividono una singola connessione. La decodifica gzip/deflate è
+    trasparente, brotli lo è se il pacchetto brotli è installato.
+
+    Il limite MAX_REQUESTS_PER_SECOND è condiviso da tutte le richieste del
+    trasporto: più worker in parallelo non aumentano il carico sul server.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, base_url: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 transport_wrapper: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None):
+        """
+        Args:
+            config: Configurazione del trasporto (default TRANSPORT_CONFIG)
+            base_url: Se indicato, schema e host di ogni URL vengono sostituiti
+                con questo (utile per puntare a un server locale nei test)
+            transport: Trasporto httpx alternativo (es. httpx.MockTransport)
+            transport_wrapper: Avvolge il trasporto di rete reale (es. per registrare le risposte)
+        """
+        self.config = {**TRANSPORT_CONFIG, **(config or {})}
+        self.base_url = base_url if base_url is not None else self.config['BASE_URL']
+        self.http2 = self.config['HTTP2'] and importlib.util.find_spec('h2') is not None
+        if self.config['HTTP2'] and not self.http2:
+            print("Pacchetto h2 non disponibile, uso HTTP/1.1 con keep-alive")
+
+        self.rate_limiter = RateLimiter(self.config['MAX_REQUESTS_PER_SECOND'])
+        self._transport = transport
+        self._transport_wrapper = transport_wrapper
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        timeout = httpx.Timeout(
+            connect=self.config['CONNECT_TIMEOUT'],
+            read=self.config['READ_TIMEOUT'],
+            write=self.config['WRITE_TIMEOUT'],
+            pool=self.config['POOL_TIMEOUT']
+        )
+        limits = httpx.Limits(
+            max_connections=self.config['MAX_CONNECTIONS'],
+            max_keepalive_connections=self.config['MAX_KEEPALIVE_CONNECTIONS'],
+            keepalive_expiry=self.config['KEEPALIVE_EXPIRY']
+        )
+        transport = self._transport
+        if transport is None and self._transport_wrapper is not None:
+            transport = self._transport_wrapper(httpx.AsyncHTTPTransport(http2=self.http2, limits=limits))
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=timeout,
+            limits=limits,
+            transport=transport,
+            follow_redirects=True
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client condiviso, creato alla prima richiesta"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def resolve_url(self, url: str) -> str:
+        """Applica l'eventuale base_url sostitutivo all'URL richiesto"""
+        if not self.base_url:
+            return url
+        target = urlsplit(url)
+        base = urlsplit(self.base_url)
+        path = base.path.rstrip('/') + target.path
+        return urlunsplit((base.scheme, base.netloc, path, target.query, target.fragment))
+
+    async def get(self, url: str, params: Optional[Dict] = None,
+                  headers: Optional[Dict] = None) -> httpx.Response:
+        """Esegue una GET sul client condiviso"""
+        await self.rate_limiter.wait()
+        return await self.client.get(self.resolve_url(url), params=params, headers=headers)
+
+    async def read_limited(self, url: str, max_bytes: int, params: Optional[Dict] = None,
+                           headers: Optional[Dict] = None) -> bytes:
+        """
+        Scarica il body (già decompresso) in streaming, interrompendo il
+        download se supera max_bytes
+        """
+        await self.rate_limiter.wait()
+        async with self.client.stream('GET', self.resolve_url(url), params=params,
+                                      headers=headers) as response:
+            response.raise_for_status()
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > max_bytes:
+                    raise ValueError(f"Risposta oltre il limite di {max_bytes} bytes: {url}")
+            return bytes(body)
+
+    async def aclose(self):
+        """Chiude il pool di connessioni"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()